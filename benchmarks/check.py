@@ -0,0 +1,207 @@
+"""Checks the layout engines and drawing functions give the same results.
+
+Run from the repository root with `python benchmarks/check.py`. Lays out random trees
+with `update_elements_r` and with each other engine, and compares every element's size
+and position. Also checks `update_dirty_r` and `update_dirty` after random changes against
+laying out the changed tree again, `SpatialIndex` hit tests against testing every element,
+and `draw_elements` and `DirtyRenderer` against `draw_r`. Exits with 1 on a mismatch."""
+import argparse
+import os
+import random
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+pg.init()
+display = pg.display.set_mode((1280, 720))
+
+import pgui
+from pgui import layout
+from pgui.element import preorder, shrink, start, end, center, space_between, space_around
+from trees import leaf
+
+aligns = [start, end, center]
+justifies = [start, end, center, space_between, space_around]
+
+def container(rng: random.Random, children: list[pgui.Element]) -> pgui.Element:
+    e = pgui.Element(
+        horizontal=rng.random() < 0.5,
+        padding=[rng.randint(0, 6) for _ in range(4)],
+        child_gap=rng.randint(0, 6),
+        sizing=(rng.choice([0, 1, 2, shrink]), rng.choice([0, 1, shrink])),
+        size=(rng.randint(0, 300), rng.randint(0, 200)),
+        align=rng.choice(aligns),
+        justify=rng.choice(justifies),
+        children=children,
+    )
+    if rng.random() < 0.2:
+        e.min_width = rng.randint(0, 100)
+    if rng.random() < 0.2: # Not below the min, the constraints are ambiguous then
+        e.max_width = rng.randint(max(50, e.min_width), 400)
+    if rng.random() < 0.2:
+        e.min_height = rng.randint(0, 60)
+    return e
+
+def subtree(rng: random.Random, font: pg.Font, n: int, depth: int = 0) -> pgui.Element:
+    """A random subtree of about n elements"""
+    if n <= 1 or depth > 6:
+        if rng.random() < 0.1:
+            return pgui.Text(text=" ".join(["word"] * rng.randint(1, 12)), font=font, wrap=True)
+        e = leaf(rng, font)
+        if rng.random() < 0.3:
+            e.sizing_w = rng.randint(1, 3)
+        if rng.random() < 0.2:
+            e.sizing_h = 1
+        return e
+
+    children = []
+    left = n - 1
+    while left > 0:
+        if children and rng.random() < 0.2: # Repeat a sibling, like the rows of a list
+            seed = rng.random()
+            size = min(left, rng.randint(1, 8))
+            children += [subtree(random.Random(seed), font, size, depth + 1) for _ in range(2)]
+            left -= 2 * size
+        else:
+            size = rng.randint(1, max(1, min(left, n // 2)))
+            children.append(subtree(rng, font, size, depth + 1))
+            left -= size
+    return container(rng, children)
+
+def random_tree(seed: int, n: int) -> pgui.Element:
+    rng = random.Random(seed)
+    root = subtree(rng, pgui.fonts.get(), n)
+    root.size = (1280, 720)
+    root.sizing = (0, 0)
+    return root
+
+def mutate(root: pgui.Element, rng: random.Random):
+    """Change a few random layout properties and children through their setters"""
+    elements = preorder(root)
+    for _ in range(rng.randint(1, 5)):
+        e = rng.choice(elements[1:] or elements)
+        kind = rng.randrange(6)
+        if kind == 0:
+            e.width = rng.randint(0, 200)
+        elif kind == 1:
+            e.padding = [rng.randint(0, 6) for _ in range(4)]
+        elif kind == 2:
+            e.sizing_w = rng.choice([0, 1, 2, shrink])
+        elif kind == 3:
+            e.justify = rng.choice(justifies)
+        elif kind == 4 and e.children:
+            e.children = e.children[:-1]
+        elif kind == 5 and e.children: # Move its last child to another container
+            child = e.children[-1]
+            inside = set(preorder(child))
+            targets = [t for t in elements if t.children and t not in inside]
+            e.children = e.children[:-1]
+            rng.choice(targets).add_child(child)
+
+def layout_worker(root: pgui.Element):
+    worker = pgui.LayoutWorker()
+    worker.request(root)
+    worker.wait()
+    worker.close()
+
+engines = {
+    'update_elements': layout.update_elements,
+    'update_elements_flat': pgui.update_elements_flat,
+    'update_elements_cached': pgui.update_elements_cached,
+    'LayoutWorker': layout_worker,
+}
+
+def geometry(root: pgui.Element) -> list[tuple[float, ...]]:
+    return [(*e.position, *e.size) for e in preorder(root)]
+
+def compare_hovered(seed: int, step: int, root: pgui.Element, rng: random.Random, points: list) -> bool:
+    """Compare the spatial index's hit tests with testing every element, at random points
+    and the given ones"""
+    index = root.hit_index
+    for pos in [(rng.uniform(0, 1280), rng.uniform(0, 720)) for _ in range(100)] + points:
+        indexed = root.get_hovered(pos)
+        root.hit_index = None
+        expected = root.get_hovered(pos)
+        root.hit_index = index
+        if indexed != expected:
+            print(f"SpatialIndex (step {step}) seed {seed}: {len(indexed)} hovered at {pos}, expected {len(expected)}")
+            return False
+    return True
+
+def compare(name: str, seed: int, expected: list, got: list) -> bool:
+    if len(expected) != len(got):
+        print(f"{name} seed {seed}: {len(got)} elements, expected {len(expected)}")
+        return False
+    for i, (a, b) in enumerate(zip(expected, got)):
+        if any(abs(x - y) > 1e-6 for x, y in zip(a, b)):
+            print(f"{name} seed {seed}: element {i} (x, y, w, h) is {b}, expected {a}")
+            return False
+    return True
+
+def check(seed: int, n: int) -> bool:
+    ok = True
+    root = random_tree(seed, n)
+    layout.update_elements_r(root)
+    expected = geometry(root)
+    for name, update in engines.items():
+        other = random_tree(seed, n)
+        update(other)
+        ok &= compare(name, seed, expected, geometry(other))
+
+    # Drawing
+    a, b = pg.Surface(display.get_size()), pg.Surface(display.get_size())
+    pgui.draw_r(root, a)
+    pgui.draw_elements(root, b)
+    if pg.image.tobytes(a, 'RGB') != pg.image.tobytes(b, 'RGB'):
+        print(f"draw_elements seed {seed}: drawn differently from draw_r")
+        ok = False
+
+    # Incremental layout and hit testing after changes, against a copy laid out in full after
+    # the same changes, since fixed sizes are kept from the previous layout. The copy is laid
+    # out first, its full updates would make the index rebuild instead of updating
+    full = random_tree(seed, n)
+    layout.update_elements_r(full)
+    expected = []
+    for step in range(3):
+        mutate(full, random.Random(seed * 100 + step))
+        layout.update_elements_r(full)
+        expected.append(geometry(full))
+
+    for name, update in [('update_dirty_r', layout.update_dirty_r), ('update_dirty', layout.update_dirty)]:
+        root = random_tree(seed, n)
+        layout.update_elements_r(root)
+        root.hit_index = pgui.SpatialIndex()
+        ok &= compare_hovered(seed, -1, root, random.Random(seed), [])
+        renderer, drawn = pgui.DirtyRenderer(), pg.Surface(display.get_size())
+        renderer.draw(root, drawn)
+        for step in range(3):
+            centers = [e.rect.center for e in preorder(root)] # Where removed elements were
+            mutate(root, random.Random(seed * 100 + step))
+            update(root)
+            ok &= compare(f'{name} (step {step})', seed, expected[step], geometry(root))
+            ok &= compare_hovered(seed, step, root, random.Random(seed + step), centers)
+            renderer.draw(root, drawn)
+            full_drawn = pg.Surface(display.get_size())
+            pgui.draw_r(root, full_drawn)
+            if pg.image.tobytes(drawn, 'RGB') != pg.image.tobytes(full_drawn, 'RGB'):
+                print(f"DirtyRenderer after {name} (step {step}) seed {seed}: drawn differently from draw_r")
+                ok = False
+
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seeds', type=int, default=50, help="Number of random trees")
+    parser.add_argument('--size', type=int, default=200, help="Elements per tree, about")
+    args = parser.parse_args()
+
+    failed = [seed for seed in range(args.seeds) if not check(seed, args.size)]
+    if failed:
+        print(f"{len(failed)} of {args.seeds} trees mismatched, seeds {failed}")
+        sys.exit(1)
+    print(f"{args.seeds} trees matched")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Element memory and construction benchmark.
+
+Run from the repository root with `python benchmarks/memory.py`. Builds flat lists of
+each element type and reports the traced bytes per element and the time to construct one."""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+pg.init()
+
+import pgui
+from trees import ICON
+
+def kinds(font: pg.Font):
+    """Returns (name, function making one element) pairs"""
+    return [
+        ('Element', lambda: pgui.Element()),
+        ('Element (args)', lambda: pgui.Element(size=(20, 10), sizing_w=1, padding=[2, 2, 2, 2], background=(255, 0, 0))),
+        ('Text', lambda: pgui.Text(text="Label", font=font)),
+        ('Text (spec)', lambda: pgui.Text(text="Label", font=(None, 20))),
+        ('SVGElement', lambda: pgui.SVGElement(ICON, size=(16, 16))),
+    ]
+
+def measure(make, n: int) -> tuple[float, float]:
+    """Returns the bytes per element still allocated after making n of them, and the microseconds per element"""
+    make() # Warm up caches
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    elements = [make() for _ in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del elements
+
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        elements = [make() for _ in range(n)]
+        times.append(time.perf_counter() - start)
+        del elements
+
+    return (after - before) / n, statistics.median(times) * 1e6 / n
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=10000)
+    args = parser.parse_args()
+
+    font = pgui.fonts.get()
+    print(f"{'kind':<16} {'bytes/node':>10} {'us/node':>9}")
+    for name, make in kinds(font):
+        size, us = measure(make, args.count)
+        print(f"{name:<16} {size:>10.0f} {us:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Headless layout and render benchmarks.
+
+Run from the repository root with `python benchmarks/run.py`. Times the full update,
+each layout pass, texture creation, drawing and hit testing on synthetic trees of
+increasing size, and reports the time per element and per call the textures allocated,
+the memory blocks still allocated afterwards and the peak traced memory."""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+pg.init()
+display = pg.display.set_mode((1280, 720))
+
+import pgui
+from pgui import layout
+from trees import shapes
+
+def count(e: pgui.Element) -> int:
+    return 1 + sum(count(c) for c in e.children)
+
+def leaves(e: pgui.Element) -> list[pgui.Element]:
+    if not e.children:
+        return [e]
+    return [l for c in e.children for l in leaves(c)]
+
+def benchmarks(root: pgui.Element, rng: random.Random):
+    """Returns (name, function) pairs to time on a laid out tree"""
+    points = [(rng.uniform(0, 1280), rng.uniform(0, 720)) for _ in range(100)]
+    leaf = rng.choice(leaves(root))
+
+    def resize_leaf():
+        leaf.width += 1
+        layout.update_dirty_r(root)
+
+    def resize_leaf_iterative():
+        leaf.width += 1
+        layout.update_dirty(root)
+
+    renderer = pgui.DirtyRenderer()
+    def redraw_all():
+        renderer.invalidate()
+        renderer.draw(root, display)
+
+    def redraw_leaf():
+        resize_leaf()
+        renderer.draw(root, display)
+
+    def hover():
+        for p in points:
+            root.get_hovered(p)
+
+    index = pgui.SpatialIndex()
+    def hover_indexed():
+        root.hit_index = index
+        hover()
+        root.hit_index = None
+
+    def resize_hover_indexed():
+        resize_leaf()
+        hover_indexed()
+
+    return [
+        ('update_elements_r', lambda: layout.update_elements_r(root)),
+        ('update_elements', lambda: layout.update_elements(root)),
+        ('update_elements_flat', lambda: pgui.update_elements_flat(root)),
+        ('update_elements_cached', lambda: pgui.update_elements_cached(root)),
+        ('update_dirty_r (1 leaf)', resize_leaf),
+        ('update_dirty (1 leaf)', resize_leaf_iterative),
+        ('set_widths_r', lambda: layout.set_widths_r(root)),
+        ('grow_widths_r', lambda: layout.grow_widths_r(root)),
+        ('set_heights_r', lambda: layout.set_heights_r(root)),
+        ('grow_heights_r', lambda: layout.grow_heights_r(root)),
+        ('position_r', lambda: layout.position_r(root)),
+        ('make_surface_r', lambda: pgui.element.make_surface_r(root)),
+        ('draw_r', lambda: pgui.draw_r(root, display)),
+        ('draw_elements', lambda: pgui.draw_elements(root, display)),
+        ('DirtyRenderer (full)', redraw_all),
+        ('DirtyRenderer (static)', lambda: renderer.draw(root, display)),
+        ('DirtyRenderer (1 leaf)', redraw_leaf),
+        ('get_hovered (x100)', hover),
+        ('get_hovered idx (x100)', hover_indexed),
+        ('update_dirty + idx hover', resize_hover_indexed),
+    ]
+
+def time_call(f, repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return times
+
+def allocations(f, repeat: int) -> tuple[float, int, int]:
+    """Returns the textures allocated per call averaged over `repeat` calls, and the
+    number of memory blocks still allocated after a call and its peak traced memory"""
+    enabled = pgui.profiler.enabled
+    pgui.profiler.enabled = True # Counts surfaces.allocated
+    surfaces = pgui.profiler.current.get('surfaces.allocated', 0)
+    for _ in range(repeat):
+        f()
+    surfaces = (pgui.profiler.current.get('surfaces.allocated', 0) - surfaces) / repeat
+    pgui.profiler.enabled = enabled
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    f()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return surfaces, retained, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shapes', nargs='+', default=list(shapes), choices=list(shapes))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--atlas', action='store_true', help="Make textures in atlas mode")
+    args = parser.parse_args()
+    pgui.atlas.enabled = args.atlas
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    print(f"{'shape':<6} {'nodes':>6}  {'benchmark':<24} {'median ms':>10} {'min ms':>9} {'us/node':>9} {'surfs':>6} {'retained':>8} {'peak KiB':>9}")
+    for shape in args.shapes:
+        for size in args.sizes:
+            rng = random.Random(size)
+            root = shapes[shape](size)
+            layout.update_elements_r(root)
+            n = count(root)
+            for name, f in benchmarks(root, rng):
+                if args.filter not in name:
+                    continue
+
+                f() # Warm up caches
+                times = time_call(f, args.repeat)
+                surfaces, retained, peak = allocations(f, args.repeat)
+                median = statistics.median(times)
+                print(f"{shape:<6} {n:>6}  {name:<24} {median * 1e3:>10.3f} {min(times) * 1e3:>9.3f} "
+                      f"{median * 1e6 / n:>9.3f} {surfaces:>6.1f} {retained:>8} {peak / 1024:>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Synthetic element trees for the benchmarks"""
+import os
+import random
+import pygame as pg
+import pgui
+
+ICON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "icon.svg")
+
+def leaf(rng: random.Random, font: pg.Font, text=True, svg=True) -> pgui.Element:
+    """A fixed size, Text or SVGElement leaf"""
+    kind = rng.random()
+    if text and kind < 0.2:
+        return pgui.Text(text=f"Label {rng.randrange(1000)}", font=font, background=(255, 255, 255))
+    if svg and kind < 0.25:
+        return pgui.SVGElement(ICON, size=(16, 16), padding=[2, 2, 2, 2])
+    return pgui.Element(
+        size=(rng.randint(4, 40), rng.randint(4, 20)),
+        background=(rng.randrange(256), rng.randrange(256), rng.randrange(256)),
+    )
+
+def wide(n: int, seed: int = 0) -> pgui.Element:
+    """A root with rows of leaves, n elements in total"""
+    rng = random.Random(seed)
+    font = pgui.fonts.get()
+    per_row = max(1, int(n ** 0.5))
+    rows = []
+    count = 1
+    while count < n:
+        row = pgui.Element(sizing_w=1, child_gap=2, children=[], align=pgui.element.center)
+        count += 1
+        for _ in range(min(per_row, n - count)):
+            row.add_child(leaf(rng, font))
+            count += 1
+        row.sizing_h = pgui.element.shrink
+        rows.append(row)
+
+    return pgui.Element(horizontal=False, size=(1280, 720), children=rows)
+
+def deep(n: int, depth: int = 64, seed: int = 0) -> pgui.Element:
+    """A root with nested chains `depth` elements deep, n elements in total"""
+    rng = random.Random(seed)
+    font = pgui.fonts.get()
+    chains = []
+    count = 1
+    while count < n:
+        length = min(depth, n - count)
+        e = leaf(rng, font)
+        for _ in range(length - 1):
+            e = pgui.Element(
+                padding=[1, 1, 1, 1],
+                sizing=(pgui.element.shrink, pgui.element.shrink),
+                horizontal=rng.random() < 0.5,
+                children=[e],
+            )
+        chains.append(e)
+        count += length
+
+    return pgui.Element(size=(1280, 720), child_gap=1, children=chains)
+
+def mixed(n: int, seed: int = 0) -> pgui.Element:
+    """A random tree of n elements mixing grow, shrink and fixed sizing"""
+    rng = random.Random(seed)
+    font = pgui.fonts.get()
+    root = pgui.Element(horizontal=False, size=(1280, 720), children=[])
+    containers = [root]
+    for _ in range(n - 1):
+        parent = rng.choice(containers[-32:])
+        if rng.random() < 0.3:
+            e = pgui.Element(
+                horizontal=rng.random() < 0.5,
+                padding=[rng.randint(0, 4) for _ in range(4)],
+                child_gap=rng.randint(0, 4),
+                sizing=(rng.choice([1, 2, pgui.element.shrink]), rng.choice([1, pgui.element.shrink])),
+                align=rng.choice([pgui.element.start, pgui.element.center, pgui.element.end]),
+                children=[],
+            )
+            containers.append(e)
+        else:
+            e = leaf(rng, font)
+            if rng.random() < 0.3:
+                e.sizing_w = rng.randint(1, 3)
+        parent.add_child(e)
+
+    return root
+
+def table(n: int, seed: int = 0) -> pgui.Element:
+    """A list of identical rows, with a label, wrapped description and icons, n elements in total"""
+    font = pgui.fonts.get()
+    rows = []
+    count = 1
+    while count < n:
+        rows.append(pgui.Element(sizing_w=1, sizing_h=pgui.element.shrink, padding=[4, 4, 2, 2], child_gap=6, children=[
+            pgui.Text(text="Name", font=font),
+            pgui.Text(text="A description long enough to wrap over a few lines", font=font, wrap=True, sizing_w=1),
+            pgui.Element(sizing=(pgui.element.shrink, pgui.element.shrink), child_gap=2,
+                         children=[pgui.SVGElement(ICON, size=(16, 16)) for _ in range(4)]),
+        ]))
+        count += 8
+
+    return pgui.Element(horizontal=False, size=(1280, 720), children=rows)
+
+shapes = {
+    'wide': wide,
+    'deep': deep,
+    'mixed': mixed,
+    'table': table,
+}
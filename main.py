@@ -13,18 +13,20 @@ def wndProc(oldWndProc, draw_callback, hWnd, message, wParam, lParam):
 pg.init()
 display = pg.display.set_mode((1280, 720), pg.RESIZABLE)
 clock = pg.Clock()
+renderer = pgui.DirtyRenderer()
+pgui.input.coalesce = True # One drag resize per frame however fast the mouse polls
 
 class GrabBar(pgui.Element):
     """Example implementation of a grab-bar in-app"""
     def __init__(self, **args):
         super().__init__(**args)
-        pgui.input.sub(pgui.actions.m1d, self.on_m1d)
+        self.listen(pgui.actions.m1d, self.on_m1d)
 
     def on_m1d(self, **args):
-        rect = pg.FRect(self.position, self.size)
-        if rect.collidepoint(args['pos']):
-            pgui.input.sub(pgui.actions.mouse_move, self.on_mouse_move)
-            pgui.input.sub(pgui.actions.m1u, self.on_m1u)
+        # Keep dragging when the mouse leaves the bar
+        pgui.input.sub(pgui.actions.mouse_move, self.on_mouse_move)
+        pgui.input.sub(pgui.actions.m1u, self.on_m1u)
+        return True
 
     def on_mouse_move(self, **args):
         # Change size of parent element in direction of parent element
@@ -49,7 +51,7 @@ class GrabBar(pgui.Element):
 
 title = pgui.Text(
     text = "HI MOM",
-    font = pg.font.SysFont('Arial', 30),
+    font = ('Arial', 30),
     background = (255, 0, 0)
 )
 
@@ -97,10 +99,8 @@ root = pgui.Element(
 def draw_and_update():
     global root, display
     root.size = pg.Vector2(display.get_size())
-    pgui.update_elements_r(root)
-    display.fill((0, 0, 0))
-    pgui.draw_r(root, display)
-    pg.display.flip()
+    pgui.update_dirty(root)
+    pg.display.update(renderer.draw(root, display))
 
 oldWndProc = win32gui.SetWindowLong(
     win32gui.GetForegroundWindow(),
@@ -108,10 +108,13 @@ oldWndProc = win32gui.SetWindowLong(
     lambda *args: wndProc(oldWndProc, draw_and_update, *args)
 )
 
-prev_hovered = []
-
 pgui.update_elements_r(root)
 
+# Slide the title in, only moves where it's drawn so nothing is laid out again
+title.offset = (-200, 0)
+title.opacity = 0
+pgui.animator.animate(title, 0.5, offset=(0, 0), opacity=1)
+
 while True:
     dt = clock.tick(120)
     for e in pg.event.get():
@@ -122,15 +125,7 @@ while True:
         else:
             pg.event.post(e)
 
-    pgui.input.update()
-
-    hovered = root.get_hovered(pgui.input.mpos)
-    for e in set(hovered) - set(prev_hovered):
-        e.on_mouse_enter()
-
-    for e in set(prev_hovered) - set(hovered):
-        e.on_mouse_exit()
-
-    prev_hovered = hovered
+    pgui.input.update(root) # Hover and route clicks to the elements under the mouse
+    pgui.animator.step(dt / 1000)
 
     draw_and_update()
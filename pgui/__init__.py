@@ -1,10 +1,25 @@
 """A Simple UI library for use with pygame-ce.
 
 Implements flex-box like elements for easy UI creation"""
-from .element import Element, draw_r
-from .layout import update_elements_r
+from .element import Element, draw_r, draw_elements
+from .layout import update_elements_r, update_dirty_r, update_elements, update_dirty
+from .flat_layout import update_elements_flat
+from .measure_cache import update_elements_cached
+from .layout_worker import LayoutWorker
+from .animation import animator, Animator
 from .input import input, actions
 from .text_element import Text
+from .text_cache import text_cache, TextCache
+from .fonts import fonts, FontRegistry
 from .svg_element import SVGElement
+from .reconcile import Node, reconcile
+from .svg_cache import svg_cache, SVGCache
+from .scroll_view import ScrollView
+from .surfaces import surfaces, SurfacePool
+from .atlas import atlas, Atlas
+from .renderer import DirtyRenderer
+from .spatial import SpatialIndex
+from .profiler import profiler, Profiler
+from .profiler_overlay import ProfilerOverlay
 
 from . import element
@@ -0,0 +1,106 @@
+from typing import Callable
+from .element import Element, draw_changed
+
+def linear(t: float) -> float: return t
+def ease_in(t: float) -> float: return t * t
+def ease_out(t: float) -> float: return t * (2 - t)
+def ease_in_out(t: float) -> float: return 2 * t * t if t < 0.5 else -1 + (4 - 2 * t) * t
+
+# Values a track animates
+x_channel = 0 # offset.x
+y_channel = 1 # offset.y
+opacity_channel = 2
+
+class Animator():
+    """Tweens elements' `offset` and `opacity`, which are only applied when drawing.
+
+    Animations never mark elements dirty, so they don't cause layout updates, and
+    DirtyRenderer only redraws the areas the animated elements were and are drawn at.
+    Each animated value is a track, stored as parallel lists that `step` advances
+    together once per frame."""
+    def __init__(self):
+        self.elements: list[Element] = []
+        self.channels: list[int] = []
+        self.starts: list[float] = []
+        self.deltas: list[float] = [] # End value - start value
+        self.elapsed: list[float] = []
+        self.durations: list[float] = []
+        self.eases: list[Callable[[float], float]] = []
+        self.done: list[Callable[[], None] | None] = []
+        self._tracks: dict[tuple[Element, int], int] = {} # (element, channel) -> index
+
+    def animate(self, e: Element, duration: float, offset=None, opacity: float | None = None,
+                ease: Callable[[float], float] = ease_out, done: Callable[[], None] | None = None):
+        """Tween the element's offset and/or opacity from their current values over `duration` seconds.
+
+        Replaces the animations of the same values already running on the element.
+        `done()` is called once they finish."""
+        targets = []
+        if offset is not None:
+            targets += [(x_channel, e.offset.x, offset[0]), (y_channel, e.offset.y, offset[1])]
+        if opacity is not None:
+            targets.append((opacity_channel, e.opacity, opacity))
+
+        for n, (channel, start, end) in enumerate(targets):
+            track = (start, end - start, 0.0, duration, ease, done if n == len(targets) - 1 else None)
+            i = self._tracks.get((e, channel))
+            if i is None:
+                self._tracks[(e, channel)] = len(self.elements)
+                self.elements.append(e)
+                self.channels.append(channel)
+                for values, value in zip(self.arrays(), track):
+                    values.append(value)
+            else:
+                for values, value in zip(self.arrays(), track):
+                    values[i] = value
+
+    def arrays(self) -> tuple[list, ...]:
+        """The per-track lists set by `animate`"""
+        return self.starts, self.deltas, self.elapsed, self.durations, self.eases, self.done
+
+    def stop(self, e: Element):
+        """Stop the element's animations where they are"""
+        self._remove([i for i, other in enumerate(self.elements) if other is e])
+
+    def step(self, dt: float) -> bool:
+        """Advance the animations by `dt` seconds and apply them, returns False if none are running"""
+        if not self.elements:
+            return False
+
+        self.elapsed = elapsed = [t + dt for t in self.elapsed]
+        progress = [t / d if t < d else 1.0 for t, d in zip(elapsed, self.durations)]
+        values = [s + d * ease(p) for s, d, ease, p in zip(self.starts, self.deltas, self.eases, progress)]
+        for e, channel, value in zip(self.elements, self.channels, values):
+            if channel == x_channel:
+                e.offset.x = value
+                draw_changed(e)
+            elif channel == y_channel:
+                e.offset.y = value
+                draw_changed(e)
+            else:
+                e.opacity = min(1.0, max(0.0, value))
+
+        if 1.0 in progress:
+            finished = [i for i, p in enumerate(progress) if p == 1.0]
+            callbacks = [self.done[i] for i in finished if self.done[i] is not None]
+            self._remove(finished)
+            for callback in callbacks:
+                callback()
+        return True
+
+    def _remove(self, indices: list[int]):
+        if not indices:
+            return
+
+        removed = set(indices)
+        keep = [i for i in range(len(self.elements)) if i not in removed]
+        self.elements = [self.elements[i] for i in keep]
+        self.channels = [self.channels[i] for i in keep]
+        self.starts, self.deltas, self.elapsed, self.durations, self.eases, self.done = (
+            [values[i] for i in keep] for values in self.arrays())
+        self._tracks = {(e, channel): i for i, (e, channel) in enumerate(zip(self.elements, self.channels))}
+
+    def clear(self):
+        self._remove(list(range(len(self.elements))))
+
+animator = Animator()
@@ -0,0 +1,124 @@
+import pygame as pg
+from .surfaces import surfaces
+from .profiler import profiler
+
+class ShelfPacker():
+    """Packs rects into rows ("shelves") across a fixed size area.
+
+    A rect goes on the lowest shelf it fits on, or a new shelf at the bottom. Space
+    isn't reused until the packer is reset, see `AtlasPage.repack`."""
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.shelves: list[list[int]] = [] # [top, height, width used]
+        self.bottom = 0
+
+    def pack(self, w: int, h: int) -> pg.Rect | None:
+        """Returns where to put a w x h rect, or None if it doesn't fit"""
+        best = None
+        for shelf in self.shelves:
+            if h <= shelf[1] and shelf[2] + w <= self.width and (best is None or shelf[1] < best[1]):
+                best = shelf
+
+        if best is None:
+            if w > self.width or self.bottom + h > self.height:
+                return None
+            best = [self.bottom, h, 0]
+            self.shelves.append(best)
+            self.bottom += h
+
+        rect = pg.Rect(best[2], best[0], w, h)
+        best[2] += w
+        return rect
+
+class AtlasPage():
+    """A shared SRCALPHA surface elements' textures are cut from"""
+    def __init__(self, size: int):
+        self.surface = pg.Surface((size, size), pg.SRCALPHA)
+        self.packer = ShelfPacker(size, size)
+        self.owners: dict = {} # Element -> rect of its texture
+        self.freed = 0 # Area released since the last repack
+
+    def repack(self) -> list:
+        """Pack the textures still in use from scratch, reclaiming the released space.
+
+        Moved textures are composited again the next time they're drawn. Returns the
+        elements whose textures no longer fit, which are removed from the page."""
+        self.packer = ShelfPacker(*self.surface.get_size())
+        self.freed = 0
+        evicted = []
+        for e, rect in sorted(self.owners.items(), key=lambda item: -item[1].h):
+            rect = self.packer.pack(rect.w, rect.h)
+            if rect is None:
+                evicted.append(e)
+                continue
+
+            self.owners[e] = rect
+            e.surface = self.surface.subsurface(rect)
+            e.redraw()
+
+        for e in evicted:
+            del self.owners[e]
+        return evicted
+
+class Atlas():
+    """Packs small element textures into a few large shared surfaces.
+
+    While `enabled`, `make_surface` cuts textures up to `max_size` pixels wide and tall
+    from up to `max_pages` pages `page_size` pixels square, and larger ones come from
+    `surfaces`. A page that fills up is repacked if enough of it was released,
+    otherwise a new page is added."""
+    def __init__(self, page_size: int = 1024, max_size: int = 128, max_pages: int = 4):
+        self.enabled = False
+        self.page_size = page_size
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.pages: list[AtlasPage] = []
+        self._owner_pages: dict = {} # Element -> AtlasPage
+
+    def acquire(self, e, size) -> pg.Surface | None:
+        """Returns a texture of `size` for the element, or None if it should get its own surface"""
+        w, h = int(size[0]), int(size[1])
+        if not w or not h or w > self.max_size or h > self.max_size:
+            return None
+
+        rect = None
+        for page in self.pages:
+            if rect := page.packer.pack(w, h):
+                break
+        else:
+            page = max(self.pages, key=lambda p: p.freed, default=None)
+            if page and page.freed >= w * h:
+                for evicted in page.repack(): # Unlikely, sorting by height packs tighter
+                    del self._owner_pages[evicted]
+                    evicted.surface = surfaces.acquire(evicted.surface.get_size())
+                    evicted.redraw()
+                if profiler.enabled:
+                    profiler.add('atlas.repacks')
+                rect = page.packer.pack(w, h)
+            if rect is None:
+                if len(self.pages) == self.max_pages:
+                    return None
+                page = AtlasPage(self.page_size)
+                self.pages.append(page)
+                rect = page.packer.pack(w, h)
+
+        page.owners[e] = rect
+        self._owner_pages[e] = page
+        return page.surface.subsurface(rect)
+
+    def release(self, e) -> bool:
+        """Free the element's texture, returns False if it wasn't from the atlas"""
+        page = self._owner_pages.pop(e, None)
+        if page is None:
+            return False
+
+        rect = page.owners.pop(e)
+        page.freed += rect.w * rect.h
+        return True
+
+    def clear(self):
+        self.pages.clear()
+        self._owner_pages.clear()
+
+atlas = Atlas()
@@ -1,5 +1,9 @@
 import pygame as pg
+import math
 from typing import Deque
+from .surfaces import surfaces
+from .atlas import atlas
+from .profiler import profiler
 
 # Config consts
 ## Axis
@@ -15,67 +19,165 @@ space_around = 4
 fit = shrink = -1
 fixed = 0
 
+# Incremented by every layout update, lets caches of element geometry know they're stale
+_layout_generation = 0
+
+def layout_generation(): return _layout_generation
+
+# (generation, elements, subtrees) of the last few updates, see layout_changed
+_layout_changes: Deque[tuple] = Deque(maxlen=8)
+
+def layout_changed(elements: list | None = None, subtrees: list | None = None):
+    """Invalidate caches of element geometry.
+
+    Updates that know what they laid out pass the `elements` whose own rect may have
+    changed and the roots of the `subtrees` whose elements' rects may have, so caches
+    can update just those. Without either, anything may have changed."""
+    global _layout_generation
+    _layout_generation += 1
+    _layout_changes.append((_layout_generation, elements, subtrees))
+
+def layout_changes(since: int) -> tuple[list, list] | None:
+    """Returns the elements and subtrees laid out since the generation, or None if
+    it's unknown, because of an update that didn't say or one too long ago"""
+    elements, subtrees = [], []
+    if since == _layout_generation:
+        return elements, subtrees
+    if since < _layout_generation - len(_layout_changes):
+        return None
+
+    for generation, changed, changed_subtrees in _layout_changes:
+        if generation <= since:
+            continue
+        if changed is None and changed_subtrees is None:
+            return None
+        elements += changed or ()
+        subtrees += changed_subtrees or ()
+
+    return elements, subtrees
+
+# Incremented when elements are added, removed, shown, hidden or made focusable, lets the tab order know it's stale
+_structure_generation = 0
+
+def structure_generation(): return _structure_generation
+
+def structure_changed():
+    global _structure_generation
+    _structure_generation += 1
+
+# Sets of elements whose drawing changed, by id, one per DirtyRenderer, see draw_changed
+_draw_listeners: dict[int, set] = {}
+
+def draw_changed(e: "Element"):
+    """Tell renderers the element's texture, position, visibility, clip, offset or opacity changed.
+
+    Setters and make_surface call this. Mutating the `position` or `offset` vectors in
+    place doesn't, so call it yourself after doing so."""
+    for changed in _draw_listeners.values():
+        changed.add(e)
+
+def listen_draw_changes(changed: set):
+    """Add the elements passed to draw_changed to the set from now on"""
+    _draw_listeners[id(changed)] = changed
+
+def unlisten_draw_changes(changed: set):
+    _draw_listeners.pop(id(changed), None)
+
 class Element():
+    __slots__ = (
+        'id', '_dirty', '_measured_w', '_measured_h',
+        '_horizontal', 'parent',
+        '_size', '_sizing', '_min_width', '_max_width', '_min_height', '_max_height', '_padding',
+        'position', '_align', '_justify', '_children', '_child_gap',
+        '_visible', '_background', '_clip', '_draw_offset', '_opacity',
+        'hovered', 'flatten', 'clickthrough', 'hit_index', 'handlers', '_focusable', 'focused',
+        'surface', '_filled', '_fill', 'surface_version',
+        '_node',
+    )
+    # Keyword arguments the constructor sets, attributes directly and properties through their setter
+    _init_args = frozenset((
+        'id', 'parent', 'position', 'visible', 'clip', 'opacity', 'hovered', 'flatten', 'clickthrough', 'hit_index',
+        'focusable', 'offset', 'horizontal', 'size', 'sizing', 'min_width', 'max_width', 'min_height', 'max_height', 'padding',
+        'align', 'justify', 'children', 'child_gap', 'background',
+    ))
+
+    _draws_content = False # If the class overrides how its texture is drawn, set for subclasses below
+    _fits_unknown = False # If the class overrides fit_height but not layout_style
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._draws_content = cls.draw_content is not Element.draw_content \
+            or cls.refresh_surface is not Element.refresh_surface or cls.draw is not Element.draw
+        cls._fits_unknown = cls.fit_height is not Element.fit_height and cls.layout_style is Element.layout_style
+
     def __init__(self, **args):
         self.id: int = 0
+        # Layout state
+        self._dirty: bool = True # Needs to be laid out, set by mark_dirty()
+        self._measured_w: float = 0 # Fixed/shrink sizes from the last measuring pass
+        self._measured_h: float = 0
         # defaults
-        self.horizontal: bool = True # Stack items horizontally
+        self._horizontal: bool = True # Stack items horizontally
         self.parent: Element | None = None
         ## Sizing
         self._size: pg.Vector2 = pg.Vector2(0, 0)
         self._sizing: pg.Vector2 = pg.Vector2(0, 0) # fixed = 0, grow > 0, fit/shrink = -1
-        self.min_width: float = 0
-        self.max_width: float = float('inf')
-        self.min_height: float = 0
-        self.max_height: float = float('inf')
-        self.padding: list[int] = [0, 0, 0, 0]
+        self._min_width: float = 0
+        self._max_width: float = math.inf # Shared, unlike float('inf')
+        self._min_height: float = 0
+        self._max_height: float = math.inf
+        self._padding: list[int] = [0, 0, 0, 0]
         ## Positioning
         self.position: pg.Vector2 = pg.Vector2(0, 0) # Topleft pos of the element
-        self.align: int = start # Start, end, center
-        self.justify: int = start # Start, end, center, space_between, space_around
-        self.children: list[Element] = []
-        self.child_gap: int = 0
+        self._align: int = start # Start, end, center
+        self._justify: int = start # Start, end, center, space_between, space_around
+        self._children: list[Element] = []
+        self._child_gap: int = 0
         ## Graphic
-        self.visible = True
-        self.background = (0, 0, 0, 0)
+        self._visible = True
+        self._background = (0, 0, 0, 0)
+        self._clip = False # Clip children to the element's rect, lets drawing and hit tests skip them
+        # Applied when drawing to the element and its descendants, without laying them out
+        self._draw_offset: pg.Vector2 | None = None # Made by the offset property
+        self._opacity: float = 1.0
         ## Other
         self.hovered = False
         self.flatten = False
         self.clickthrough = False
+        self.hit_index = None # Optional spatial.SpatialIndex used by get_hovered
+        self.handlers = None # Action -> callbacks, made by listen()
+        self._focusable = False # Can take key events, by clicking or tabbing to it
+        self.focused = False
+
+        # Cache the element's texture
+        ## Created when updated
+        self.surface: pg.Surface | None = None
+        self._filled = None # Background the texture was last composited with, None if stale
+        self._fill = None # Colour drawn instead of a texture in atlas mode, () to draw nothing
+        self.surface_version: int = 0 # Incremented when the texture is composited
 
         # Override defaults
-        for arg in args:
-            if arg in self.__dict__:
-                self.__dict__[arg] = args[arg]
+        init_args = self._init_args
+        for arg, value in args.items():
+            if arg in init_args:
+                setattr(self, arg, value)
 
         self.width, self.height = self._size # Make sure size respects min/max constraints
 
         # Custom properties
-        if size := args.get('size'):
-            self.size = size
-
         if w := args.get('width'):
             self.width = w
 
         if h := args.get('height'):
             self.height = h
 
-        if sizing := args.get('sizing'):
-            self.sizing = sizing
-
         if size_w := args.get('sizing_w'):
             self.sizing_w = size_w
 
         if size_h := args.get('sizing_h'):
             self.sizing_h = size_h
 
-        # Set childrens' parent
-        for child in self.children:
-            child.parent = self
-
-        # Cache the element's texture
-        ## Created when updated
-        self.surface: pg.Surface | None = None
+        self._node = None # reconcile.Node the element was last made or patched from
 
     def is_leaf(self):
         return len(self.children) == 0
@@ -84,31 +186,260 @@ class Element():
         if not position in range(-1, len(self.children)):
             raise ValueError(f"{position} position out of range of children")
 
-        self.children.insert(position, c)
+        if position == -1:
+            self.children.append(c)
+        else:
+            self.children.insert(position, c)
+        c.parent = self
+        self.mark_dirty()
+        draw_changed(self)
+        structure_changed()
+
+    def remove_child(self, c: "Element"):
+        self.children.remove(c)
+        c.parent = None
+        self.mark_dirty()
+        draw_changed(self)
+        structure_changed()
+
+    @property
+    def dirty(self): return self._dirty
+
+    def mark_dirty(self):
+        """Flag the element and its ancestors to be laid out on the next update.
+
+        Setters of layout properties call this. Mutating the `children`, `padding`
+        or `sizing` objects in place doesn't, so call it yourself after doing so."""
+        e = self
+        while e is not None and not e._dirty:
+            e._dirty = True
+            e = e.parent
+
+    def redraw(self):
+        """Flag the element's content as changed, so its texture is composited again"""
+        self._filled = None
+        draw_changed(self)
+
+    def draw_content(self, surf: pg.Surface):
+        """Draw the element's content onto its texture, over its background"""
+        pass
+
+    def refresh_surface(self):
+        """Composite the background and content into the texture if either changed"""
+        if self.surface is not None and self._filled != self._background:
+            self.surface.fill(self._background)
+            self.draw_content(self.surface)
+            self._filled = self._background
+            self.surface_version += 1
+            draw_changed(self)
 
-    def draw(self, surf: pg.Surface):
+    @property
+    def plain(self):
+        """True if the element is just an opaque or invisible background, which atlas mode
+        fills straight onto the target instead of giving it a texture"""
+        return not self._draws_content and pg.Color(self._background).a in (0, 255)
+
+    def draw(self, surf: pg.Surface, dest=None, opacity: float = 1.0):
+        """Draw the texture at `dest`, the element's position by default, blended by `opacity`"""
+        if dest is None:
+            dest = self.position
+        alpha = int(opacity * 255)
         if self.surface is None:
-            raise ValueError("Element is missing texture")
+            if self._fill is None:
+                raise ValueError("Element is missing texture")
+            if self._fill:
+                if alpha < 255:
+                    fill = pg.Surface(self._size)
+                    fill.fill(self._fill)
+                    fill.set_alpha(alpha)
+                    surf.blit(fill, dest)
+                else:
+                    surf.fill(self._fill, pg.Rect(dest, self._size))
+                if profiler.enabled:
+                    profiler.add('draw.fills')
+            return
+
+        self.refresh_surface()
+        if alpha < 255:
+            old = self.surface.get_alpha()
+            self.surface.set_alpha(alpha)
+            surf.blit(self.surface, dest)
+            self.surface.set_alpha(old)
+        else:
+            surf.blit(self.surface, dest)
+        if profiler.enabled:
+            profiler.add('draw.blits')
+
+    @property
+    def offset(self):
+        """Offset the element and its descendants are drawn at from their laid out positions.
+        Only changes where they're drawn, hit tests use the laid out positions"""
+        if self._draw_offset is None:
+            self._draw_offset = pg.Vector2(0, 0)
+        return self._draw_offset
+    @offset.setter
+    def offset(self, value):
+        self.offset.update(value)
+        draw_changed(self)
+
+    @property
+    def visible(self): return self._visible
+    @visible.setter
+    def visible(self, value):
+        if value != self._visible:
+            self._visible = value
+            draw_changed(self)
+            structure_changed()
 
-        surf.blit(self.surface, self.position)
+    @property
+    def focusable(self): return self._focusable
+    @focusable.setter
+    def focusable(self, value):
+        if value != self._focusable:
+            self._focusable = value
+            structure_changed()
+
+    @property
+    def clip(self): return self._clip
+    @clip.setter
+    def clip(self, value):
+        if value != self._clip:
+            self._clip = value
+            draw_changed(self)
+            if self.parent is not None or self.hit_index is not None: # In a tree, its descendants' hit rects changed
+                layout_changed(subtrees=[self])
+
+    @property
+    def opacity(self): return self._opacity # Applied when drawing, multiplied by the ancestors'
+    @opacity.setter
+    def opacity(self, value):
+        if value != self._opacity:
+            self._opacity = value
+            draw_changed(self)
 
     @property
     def sizing(self): return self._sizing # Returns the object so other elements can reference its size if needed
     @sizing.setter
     def sizing(self, value):
         self._sizing.update(value)
+        self.mark_dirty()
 
     @property
     def sizing_w(self): return int(self._sizing.x)
     @sizing_w.setter
     def sizing_w(self, value):
         self._sizing.x = value
+        self.mark_dirty()
 
     @property
     def sizing_h(self): return int(self._sizing.y)
     @sizing_h.setter
     def sizing_h(self, value):
         self._sizing.y = value
+        self.mark_dirty()
+
+    # Layout properties, changing them marks the element dirty
+    @property
+    def horizontal(self): return self._horizontal
+    @horizontal.setter
+    def horizontal(self, value):
+        self._horizontal = value
+        self.mark_dirty()
+
+    @property
+    def children(self): return self._children
+    @children.setter
+    def children(self, value):
+        old, self._children = self._children, value
+        if old is not value:
+            kept = set(value)
+            for c in old:
+                if c not in kept and c.parent is self: # Unless already moved to another parent
+                    c.parent = None
+        for c in value:
+            c.parent = self
+        self.mark_dirty()
+        draw_changed(self)
+        structure_changed()
+
+    @property
+    def padding(self): return self._padding
+    @padding.setter
+    def padding(self, value):
+        self._padding = value
+        self.mark_dirty()
+
+    @property
+    def child_gap(self): return self._child_gap
+    @child_gap.setter
+    def child_gap(self, value):
+        self._child_gap = value
+        self.mark_dirty()
+
+    @property
+    def align(self): return self._align
+    @align.setter
+    def align(self, value):
+        self._align = value
+        self.mark_dirty()
+
+    @property
+    def justify(self): return self._justify
+    @justify.setter
+    def justify(self, value):
+        self._justify = value
+        self.mark_dirty()
+
+    @property
+    def background(self): return self._background
+    @background.setter
+    def background(self, value):
+        # Doesn't change the layout, only the texture
+        if value == self._background:
+            return
+        self._background = value
+        if self.surface is None and self._fill is not None: # Filled in atlas mode
+            if self.plain:
+                self._fill = value if pg.Color(value).a else ()
+                self.surface_version += 1
+                draw_changed(self)
+            else:
+                self.mark_dirty() # Needs a texture now
+        else:
+            self.redraw()
+
+    # Size constraints, reapplied to the current size when changed
+    @property
+    def min_width(self): return self._min_width
+    @min_width.setter
+    def min_width(self, value):
+        self._min_width = value
+        self.width = self._size.x
+        self.mark_dirty()
+
+    @property
+    def max_width(self): return self._max_width
+    @max_width.setter
+    def max_width(self, value):
+        self._max_width = value
+        self.width = self._size.x
+        self.mark_dirty()
+
+    @property
+    def min_height(self): return self._min_height
+    @min_height.setter
+    def min_height(self, value):
+        self._min_height = value
+        self.height = self._size.y
+        self.mark_dirty()
+
+    @property
+    def max_height(self): return self._max_height
+    @max_height.setter
+    def max_height(self, value):
+        self._max_height = value
+        self.height = self._size.y
+        self.mark_dirty()
 
     @property
     def size(self): return self._size
@@ -118,6 +449,9 @@ class Element():
         self.width = w
         self.height = h
 
+    @property
+    def rect(self): return pg.FRect(self.position, self._size)
+
     def inflate(self, left=0, right=0, top=0, bottom=0):
         # TODO: Account for hitting size constraints
         if left > 0:
@@ -135,46 +469,59 @@ class Element():
     @property
     def width(self): return self._size.x
     @width.setter
-    def width(self, value): self._size.x = pg.math.clamp(value, self.min_width, self.max_width)
+    def width(self, value):
+        value = pg.math.clamp(value, self._min_width, self._max_width)
+        if value != self._size.x:
+            self._size.x = value
+            self.mark_dirty()
 
     # Height getter/setter
     @property
     def height(self): return self._size.y
     @height.setter
-    def height(self, value): self._size.y = pg.math.clamp(value, self.min_height, self.max_height)
+    def height(self, value):
+        value = pg.math.clamp(value, self._min_height, self._max_height)
+        if value != self._size.y:
+            self._size.y = value
+            self.mark_dirty()
 
     # Edge getters/setters
     @property
     def left(self): return self.position.x
     @left.setter
-    def left(self, value): self.position.x = value
+    def left(self, value):
+        self.position.x = value
+        draw_changed(self)
 
     @property
     def top(self): return self.position.y
     @top.setter
-    def top(self, value): self.position.y = value
+    def top(self, value):
+        self.position.y = value
+        draw_changed(self)
 
     @property
     def right(self): return self.position.x + self._size.x
     @right.setter
-    def right(self, value): self.position.x = value - self._size.x
+    def right(self, value): self.left = value - self._size.x
 
     @property
     def bottom(self): return self.position.y + self._size.y
     @bottom.setter
-    def bottom(self, value): self.position.y = value - self._size.y
+    def bottom(self, value): self.top = value - self._size.y
 
     @property
     def center(self): return self.position + 0.5 * self._size
     @center.setter
     def center(self, value):
         self.position = value - 0.5 * self.size
+        draw_changed(self)
 
     @property
     def centerx(self): return self.position.x + 0.5 * self._size.x
     @centerx.setter
     def centerx(self, value):
-        self.position.x = value - 0.5 * self._size.x
+        self.left = value - 0.5 * self._size.x
 
     @property
     def centery(self): return self.position.y + 0.5 * self.height
@@ -182,25 +529,79 @@ class Element():
     def centery(self, value):
         self.top = value - 0.5 * self.height
 
+    def fit_height(self):
+        """Called when measuring heights, once the element's width is final.
+        Elements whose height depends on their width set it here"""
+        pass
+
+    def layout_style(self) -> tuple | None:
+        """The element's own layout inputs, equal for elements laid out the same way given the
+        same children, see `update_elements_cached`. None if it can't be compared, subclasses
+        overriding fit_height add the inputs it reads"""
+        if self._fits_unknown:
+            return None
+
+        sizing = self._sizing
+        return (type(self), self._horizontal, sizing.x, sizing.y,
+                self._size.x if sizing.x == fixed else None, self._size.y if sizing.y == fixed else None,
+                self._min_width, self._max_width, self._min_height, self._max_height,
+                tuple(self.padding), self._child_gap, self._align, self._justify)
+
+    def copy_layout(self, other: "Element"):
+        """Take the size of an element with the same layout style laid out at the same size,
+        instead of being laid out"""
+        self._size.update(other._size)
+        self._measured_w = other._measured_w
+        self._measured_h = other._measured_h
+
+    def on_layout(self):
+        """Called after the element's size and position are updated, before its texture is made"""
+        pass
+
+    def listen(self, action, callback):
+        """Call `callback(target=element, **event)` when `action` happens to the element.
+
+        Mouse events go to the hovered element and key events to the focused one, then bubble
+        up through its ancestors, `target` being the element they started at. Returning True
+        stops them from bubbling further."""
+        if self.handlers is None:
+            self.handlers = {}
+        self.handlers.setdefault(action, []).append(callback)
+
+    def unlisten(self, action, callback):
+        self.handlers[action].remove(callback)
+
+    def on_focus(self):
+        pass
+
+    def on_blur(self):
+        pass
+
     def on_mouse_enter(self):
         pass
 
     def on_mouse_exit(self):
         pass
 
-    def bfs(self):
+    def bfs(self, pos=None):
+        """Returns the element and its descendants breadth first, skipping clickthrough descendants.
+
+        If `pos` is given, the children of clipping elements not containing it are skipped."""
         result = [self]
         if self.flatten:
             return result
 
         q = Deque()
-        for c in self.children:
-            q.append(c)
+        if not (pos is not None and self._clip and not self.rect.collidepoint(pos)):
+            for c in self.children:
+                q.append(c)
 
         while len(q) > 0:
             curr = q.popleft()
             if not curr.clickthrough:
                 result.append(curr)
+            if pos is not None and curr._clip and not curr.rect.collidepoint(pos):
+                continue
             for c in curr.children:
                 q.append(c)
 
@@ -208,7 +609,10 @@ class Element():
 
     def get_hovered(self, pos):
         """Returns the hovered elements, deepest first"""
-        elements = reversed(self.bfs())
+        if self.hit_index is not None:
+            return self.hit_index.get_hovered(self, pos)
+
+        elements = reversed(self.bfs(pos))
         collided = []
         for e in elements:
             rect = pg.FRect(e.position, e.size)
@@ -217,16 +621,196 @@ class Element():
 
         return collided
 
+def make_surface(e: Element):
+    """Make the element's texture. The element is up to date after this
+
+    The texture is kept if the element's size didn't change, and is only composited
+    again if its background or content changed."""
+    e.on_layout()
+
+    size = (int(e.width), int(e.height))
+    if atlas.enabled and e.plain: # Filled when drawn, no texture needed
+        if e.surface is not None:
+            release_surface(e)
+        fill = e._background if pg.Color(e._background).a else ()
+        if fill != e._fill:
+            e._fill = fill
+            e.surface_version += 1
+    else:
+        e._fill = None
+        if e.surface is None or e.surface.get_size() != size:
+            if e.surface is not None:
+                release_surface(e)
+            if atlas.enabled:
+                e.surface = atlas.acquire(e, size)
+            if e.surface is None:
+                e.surface = surfaces.acquire(size)
+            e._filled = None
+
+    e.refresh_surface()
+    e._dirty = False
+    draw_changed(e)
+    if profiler.enabled:
+        profiler.add('layout.nodes')
+
+def release_surface(e: Element):
+    """Return the element's texture to the atlas or pool it came from"""
+    if not atlas.release(e):
+        surfaces.release(e.surface)
+    e.surface = None
+    e._filled = None
+    draw_changed(e)
+
+def free_surface_r(e: Element):
+    """Recursively return the elements' textures to the pool"""
+    if e.surface is not None:
+        release_surface(e)
+
+    for child in e.children:
+        free_surface_r(child)
+
 def make_surface_r(e: Element):
     """Recursively make the elements' textures"""
-    e.surface = pg.Surface(e.size, pg.SRCALPHA)
-    e.surface.fill(e.background)
+    make_surface(e)
 
     for child in e.children:
         make_surface_r(child)
 
+def preorder(e: Element) -> list[Element]:
+    """Returns the element and its descendants depth first, each element before its children.
+
+    Reversing the list visits every element after its children."""
+    result = []
+    stack = [e]
+    while stack:
+        e = stack.pop()
+        result.append(e)
+        stack.extend(reversed(e.children))
+
+    return result
+
+def make_surfaces(e: Element):
+    """Make the elements' textures like make_surface_r, without recursing"""
+    stack = [e]
+    while stack:
+        e = stack.pop()
+        make_surface(e)
+        # Read after on_layout, which may replace the children
+        stack.extend(reversed(e.children))
+
 def draw_r(e: Element, surf: pg.Surface):
-    """Recursively draw elements"""
-    e.draw(surf)
+    """Recursively draw visible elements"""
+    profiler.run('draw', _draw_r, e, surf)
+
+def _draw_r(e: Element, surf: pg.Surface, dx: float = 0, dy: float = 0, opacity: float = 1.0):
+    if not e._visible:
+        return
+    if e._draw_offset:
+        dx += e._draw_offset.x
+        dy += e._draw_offset.y
+    if e._opacity != 1.0:
+        opacity *= e._opacity
+        if opacity <= 0:
+            return
+    if profiler.enabled:
+        profiler.add('draw.nodes')
+
+    dest = (e.position.x + dx, e.position.y + dy) if dx or dy else None
+    e.draw(surf, dest, opacity)
+    if not e._clip:
+        for c in e.children:
+            _draw_r(c, surf, dx, dy, opacity)
+        return
+
+    # Only draw the children inside the element, if any of it is on the surface
+    clip = surf.get_clip()
+    area = clip.clip(pg.Rect(dest or e.position, e.size))
+    if not area:
+        return
+
+    surf.set_clip(area)
     for c in e.children:
-        draw_r(c, surf)
+        _draw_r(c, surf, dx, dy, opacity)
+    surf.set_clip(clip)
+
+def draw_elements(e: Element, surf: pg.Surface):
+    """Draw visible elements like draw_r, without recursing"""
+    profiler.run('draw', _draw_elements, e, surf)
+
+def _draw_elements(root: Element, surf: pg.Surface):
+    # Elements to draw, and the clips and (dx, dy, opacity) transforms to restore once an
+    # element's children are drawn
+    stack: list[Element | pg.Rect | tuple] = [root]
+    batch: list[tuple[pg.Surface, pg.Vector2]] = [] # Textures drawn in one call until the clip changes
+    dx = dy = 0
+    opacity = 1.0
+    while stack:
+        e = stack.pop()
+        if e.__class__ is pg.Rect:
+            blit_batch(surf, batch)
+            surf.set_clip(e)
+            continue
+        if e.__class__ is tuple:
+            dx, dy, opacity = e
+            continue
+        if not e._visible:
+            continue
+
+        transform = e._draw_offset or e._opacity != 1.0
+        if transform:
+            parent_transform = (dx, dy, opacity)
+            if e._draw_offset:
+                dx += e._draw_offset.x
+                dy += e._draw_offset.y
+            opacity *= e._opacity
+            if opacity <= 0:
+                dx, dy, opacity = parent_transform
+                continue
+        if profiler.enabled:
+            profiler.add('draw.nodes')
+
+        dest = (e.position.x + dx, e.position.y + dy) if dx or dy else e.position
+        if e.__class__.draw is not Element.draw or e.surface is None and e._fill is None or opacity != 1.0:
+            blit_batch(surf, batch)
+            e.draw(surf, dest, opacity)
+        elif e.surface is not None:
+            e.refresh_surface()
+            batch.append((e.surface, dest))
+        elif e._fill: # Transparent plain elements draw nothing, no need to end the batch
+            blit_batch(surf, batch)
+            surf.fill(e._fill, pg.Rect(dest, e._size))
+            if profiler.enabled:
+                profiler.add('draw.fills')
+        if not e.children:
+            if transform:
+                dx, dy, opacity = parent_transform
+            continue
+
+        if transform:
+            stack.append(parent_transform)
+        if e._clip:
+            # Only draw the children inside the element, if any of it is on the surface
+            clip = surf.get_clip()
+            area = clip.clip(pg.Rect(dest, e.size))
+            if not area:
+                if transform:
+                    dx, dy, opacity = stack.pop()
+                continue
+
+            blit_batch(surf, batch)
+            surf.set_clip(area)
+            stack.append(clip)
+        stack.extend(reversed(e.children))
+
+    blit_batch(surf, batch)
+
+def blit_batch(surf: pg.Surface, batch: list[tuple[pg.Surface, pg.Vector2]]):
+    """Draw and empty a list of (texture, position) pairs"""
+    if not batch:
+        return
+
+    surf.fblits(batch)
+    if profiler.enabled:
+        profiler.add('draw.blits', len(batch))
+        profiler.add('draw.batches')
+    batch.clear()
@@ -0,0 +1,268 @@
+from .element import *
+from .profiler import profiler
+
+# Same as pg.math.clamp, inlined into the loops below
+# lo if v < lo else hi if v > hi else v
+
+class FlatTree():
+    """Struct of arrays copy of an element tree's layout inputs and outputs.
+
+    Elements are stored breadth first, so each element's children are the contiguous
+    range [first[i], first[i] + count[i]), parents come before their children and
+    reversing the order visits children before their parents."""
+    def __init__(self, root: Element):
+        self.elements: list[Element] = [root]
+        self.first: list[int] = []
+        self.count: list[int] = []
+        elements = self.elements
+        first, count = self.first, self.count
+        for e in elements: # Grows while iterating, breadth first
+            children = e._children
+            first.append(len(elements))
+            count.append(len(children))
+            elements.extend(children)
+
+        # Read the properties' backing fields, the setters already clamped and validated them
+        sizes = [e._size for e in elements]
+        self.w = [s.x for s in sizes]
+        self.h = [s.y for s in sizes]
+        positions = [e.position for e in elements]
+        self.x = [p.x for p in positions]
+        self.y = [p.y for p in positions]
+        self.measured_w = [0.0] * len(elements)
+        self.measured_h = [0.0] * len(elements)
+        sizings = [e._sizing for e in elements]
+        self.sizing_w = [int(s.x) for s in sizings]
+        self.sizing_h = [int(s.y) for s in sizings]
+        self.min_w = [e._min_width for e in elements]
+        self.max_w = [e._max_width for e in elements]
+        self.min_h = [e._min_height for e in elements]
+        self.max_h = [e._max_height for e in elements]
+        paddings = [e.padding for e in elements] # Through the property, subclasses can adjust it
+        self.pad_l = [p[0] for p in paddings]
+        self.pad_r = [p[1] for p in paddings]
+        self.pad_t = [p[2] for p in paddings]
+        self.pad_b = [p[3] for p in paddings]
+        self.gap = [e._child_gap for e in elements]
+        self.horizontal = [e._horizontal for e in elements]
+        self.align = [e._align for e in elements]
+        self.justify = [e._justify for e in elements]
+        # Elements overriding the fit_height hook, which is called on them when measuring heights
+        default_fit = Element.fit_height
+        self.fits_height = [type(e).fit_height is not default_fit for e in elements]
+
+    def write_back(self):
+        """Copy the sizes and positions into the elements"""
+        for i, e in enumerate(self.elements):
+            e._size.update(self.w[i], self.h[i])
+            e.position.update(self.x[i], self.y[i])
+            e._measured_w = self.measured_w[i]
+            e._measured_h = self.measured_h[i]
+
+def update_elements_flat(e: Element):
+    """Update elements like update_elements_r, running the layout passes as loops over a FlatTree"""
+    tree = FlatTree(e)
+    run = profiler.run
+    run('layout.set_widths', set_widths_flat, tree)
+    run('layout.grow_widths', grow_widths_flat, tree)
+    run('layout.set_heights', set_heights_flat, tree)
+    run('layout.grow_heights', grow_heights_flat, tree)
+    run('layout.position', position_flat, tree)
+    tree.write_back()
+
+    run('layout.make_surfaces', make_surfaces, e)
+
+    layout_changed()
+
+def set_widths_flat(t: FlatTree):
+    """Set fixed and shrink widths, children first"""
+    w, measured, sizing, lo, hi = t.w, t.measured_w, t.sizing_w, t.min_w, t.max_w
+    for i in range(len(w) - 1, -1, -1):
+        if sizing[i] > 0:
+            w[i] = lo[i] if 0 < lo[i] else hi[i] if 0 > hi[i] else 0
+        elif sizing[i] == shrink:
+            first, n = t.first[i], t.count[i]
+            if t.horizontal[i]:
+                v = t.pad_l[i] + t.pad_r[i] + t.gap[i] * (n - 1) + sum(measured[first:first + n])
+            else:
+                v = t.pad_l[i] + t.pad_r[i] + max(measured[first:first + n], default=0)
+            w[i] = lo[i] if v < lo[i] else hi[i] if v > hi[i] else v
+        measured[i] = w[i]
+
+def fit_heights_flat(t: FlatTree, keep_size: bool = False):
+    """Call fit_height on the elements overriding it at their laid out width, and store their heights.
+
+    With `keep_size` the elements' sizes are restored afterwards, for when the result
+    is written back later."""
+    h = t.h
+    for i, fits in enumerate(t.fits_height):
+        if fits:
+            e = t.elements[i]
+            size = e._size.copy()
+            e._size.update(t.w[i], h[i])
+            e.fit_height()
+            h[i] = e.height
+            if keep_size:
+                e._size.update(size)
+
+def set_heights_flat(t: FlatTree, fit: bool = True):
+    """Set fixed and shrink heights, children first.
+
+    Without `fit` the heights from `fit_heights_flat` are used, and no element is touched."""
+    if fit:
+        fit_heights_flat(t)
+
+    h, measured, sizing, lo, hi = t.h, t.measured_h, t.sizing_h, t.min_h, t.max_h
+    for i in range(len(h) - 1, -1, -1):
+        if sizing[i] > 0:
+            h[i] = lo[i] if 0 < lo[i] else hi[i] if 0 > hi[i] else 0
+        elif sizing[i] == shrink:
+            first, n = t.first[i], t.count[i]
+            if t.horizontal[i]:
+                v = t.pad_t[i] + t.pad_b[i] + max(measured[first:first + n], default=0)
+            else:
+                v = t.pad_t[i] + t.pad_b[i] + sum(measured[first:first + n]) + (n - 1) * t.gap[i]
+            h[i] = lo[i] if v < lo[i] else hi[i] if v > hi[i] else v
+        measured[i] = h[i]
+
+def grow(size: list[float], sizing: list[int], lo: list[float], hi: list[float],
+         first: int, n: int, available: float, gap: float):
+    """Distribute the space left along the main axis between the growing children"""
+    children = range(first, first + n)
+    to_grow: list[int] = []
+    num_partitions = 0
+    remaining_space = available - sum(size[first:first + n]) - (n - 1) * gap
+    for c in children:
+        if sizing[c] > 0:
+            to_grow.append(c)
+            num_partitions += sizing[c]
+            remaining_space += size[c]
+
+    # Set the children whose target is below their minimum to it first
+    dirty_children = []
+    for c in to_grow:
+        target = sizing[c] * remaining_space / num_partitions
+        if target <= lo[c]:
+            v = lo[c]
+            size[c] = lo[c] if v < lo[c] else hi[c] if v > hi[c] else v
+            remaining_space -= size[c]
+            num_partitions -= sizing[c]
+            dirty_children.append(c)
+
+    for c in dirty_children:
+        to_grow.remove(c)
+
+    while remaining_space > 0 and to_grow:
+        curr_space_used = 0
+        dirty_children = []
+        for c in to_grow:
+            target = sizing[c] * remaining_space / num_partitions
+            v = size[c] + target
+            size[c] = lo[c] if v < lo[c] else hi[c] if v > hi[c] else v
+            if size[c] < target: # If we hit the max
+                curr_space_used += size[c]
+                dirty_children.append(c)
+                num_partitions -= sizing[c]
+
+        for c in dirty_children:
+            to_grow.remove(c)
+        if curr_space_used == 0:
+            break
+
+        remaining_space -= curr_space_used
+
+def grow_widths_flat(t: FlatTree):
+    """Grow child widths, parents first"""
+    w, sizing, lo, hi = t.w, t.sizing_w, t.min_w, t.max_w
+    for i in range(len(w)):
+        first, n = t.first[i], t.count[i]
+        if not n:
+            continue
+
+        inner = w[i] - (t.pad_l[i] + t.pad_r[i])
+        if not t.horizontal[i]:
+            for c in range(first, first + n):
+                if sizing[c] > 0:
+                    w[c] = lo[c] if inner < lo[c] else hi[c] if inner > hi[c] else inner
+        else:
+            grow(w, sizing, lo, hi, first, n, inner, t.gap[i])
+
+def grow_heights_flat(t: FlatTree):
+    """Grow child heights, parents first"""
+    h, sizing, lo, hi = t.h, t.sizing_h, t.min_h, t.max_h
+    for i in range(len(h)):
+        first, n = t.first[i], t.count[i]
+        if not n:
+            continue
+
+        inner = h[i] - (t.pad_t[i] + t.pad_b[i])
+        if t.horizontal[i]:
+            for c in range(first, first + n):
+                if sizing[c] > 0:
+                    h[c] = lo[c] if inner < lo[c] else hi[c] if inner > hi[c] else inner
+        else:
+            grow(h, sizing, lo, hi, first, n, inner, t.gap[i])
+
+def position_flat(t: FlatTree):
+    """Align and justify children, parents first"""
+    for i in range(len(t.w)):
+        if t.count[i]:
+            if t.horizontal[i]:
+                align_flat(t.y, t.h, t.align[i], i, t.first[i], t.count[i], t.pad_t[i], t.pad_b[i])
+                justify_flat(t.x, t.w, t.justify[i], i, t.first[i], t.count[i], t.pad_l[i], t.pad_r[i], t.gap[i])
+            else:
+                align_flat(t.x, t.w, t.align[i], i, t.first[i], t.count[i], t.pad_l[i], t.pad_r[i])
+                justify_flat(t.y, t.h, t.justify[i], i, t.first[i], t.count[i], t.pad_t[i], t.pad_b[i], t.gap[i])
+
+def align_flat(pos: list[float], size: list[float], how: int, i: int, first: int, n: int,
+               pad_start: float, pad_end: float):
+    """Align children on the cross axis, `pos` and `size` being that axis' arrays"""
+    children = range(first, first + n)
+    if how == start:
+        p = pos[i] + pad_start
+        for c in children:
+            pos[c] = p
+    elif how == end:
+        p = pos[i] + size[i] - pad_end
+        for c in children:
+            pos[c] = p - size[c]
+    elif how == center:
+        p = pos[i] + 0.5 * size[i]
+        for c in children:
+            pos[c] = p - 0.5 * size[c]
+
+def justify_flat(pos: list[float], size: list[float], how: int, i: int, first: int, n: int,
+                 pad_start: float, pad_end: float, gap: float):
+    """Justify children on the main axis, `pos` and `size` being that axis' arrays"""
+    children = range(first, first + n)
+    if how == start or (how == space_between and n == 1):
+        curr = pos[i] + pad_start
+        for c in children:
+            pos[c] = curr
+            curr += size[c] + gap
+    elif how == end:
+        curr = pos[i] + size[i] - pad_end
+        for c in reversed(children):
+            pos[c] = curr - size[c]
+            curr -= size[c] + gap
+    elif how == center:
+        total = gap * (n - 1) + sum(size[first:first + n])
+        curr = pos[i] + 0.5 * size[i] - 0.5 * total
+        for c in children:
+            pos[c] = curr
+            curr += size[c] + gap
+    elif how == space_around:
+        space_size = (size[i] - sum(size[first:first + n]) - (pad_start + pad_end)) / (n * 2)
+        curr = pos[i] + pad_start
+        lo = pos[i] + pad_start
+        for c in children:
+            hi = pos[i] + size[i] - pad_end - size[c]
+            v = curr + space_size
+            pos[c] = lo if v < lo else hi if v > hi else v
+            curr += space_size * 2 + size[c]
+    elif how == space_between:
+        space_size = (size[i] - sum(size[first:first + n]) - (pad_start + pad_end)) / (n - 1)
+        curr = pos[i] + pad_start
+        for c in children:
+            pos[c] = curr
+            curr += size[c] + space_size
@@ -0,0 +1,44 @@
+import os
+import pygame as pg
+
+class FontRegistry():
+    """Loads each font once and shares it between Text elements.
+
+    Fonts are keyed by (name, size, bold, italic). `name` is a font file path, a system
+    font name, or None for pygame's default font."""
+    def __init__(self):
+        self._fonts: dict[tuple, pg.Font] = {}
+
+    def get(self, name: str | None = None, size: int = 20, bold: bool = False, italic: bool = False) -> pg.Font:
+        """Returns the font, loading it the first time it's asked for"""
+        key = (name, size, bold, italic)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        if name is None or os.path.isfile(name):
+            font = pg.Font(name, size)
+            font.bold = bold
+            font.italic = italic
+        else:
+            font = pg.font.SysFont(name, size, bold, italic)
+        self._fonts[key] = font
+        return font
+
+    def resolve(self, spec=None) -> pg.Font:
+        """Returns the font for a spec: a pg.Font as is, None for the default font, a name,
+        or a (name, size, bold, italic) tuple with the last three optional"""
+        if isinstance(spec, pg.Font):
+            return spec
+        if spec is None:
+            return self.get()
+        if isinstance(spec, (str, os.PathLike)):
+            return self.get(os.fspath(spec))
+        if not isinstance(spec, (tuple, list)):
+            raise TypeError(f"Font spec must be a pg.Font, None, a name or a (name, size, bold, italic) tuple, not {spec!r}")
+        return self.get(*spec)
+
+    def clear(self):
+        self._fonts.clear()
+
+fonts = FontRegistry()
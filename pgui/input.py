@@ -1,5 +1,8 @@
 import pygame as pg
+import time
 from enum import IntEnum, auto
+from .profiler import profiler
+from .element import layout_generation, structure_generation
 
 class actions(IntEnum):
     m1d = auto()
@@ -10,6 +13,36 @@ class actions(IntEnum):
     m3u = auto()
     mouse_move = auto()
     mwheel = auto()
+    key_down = auto()
+    key_up = auto()
+    text_input = auto()
+
+# Sent to the focused element rather than the hovered one
+key_actions = (actions.key_down, actions.key_up, actions.text_input)
+
+def coalesce_events(events: list[pg.Event]) -> list[pg.Event]:
+    """Merge consecutive mouse motion events into the last one with their `rel` summed, and
+    all the wheel events into the first one with their deltas summed"""
+    result: list[pg.Event] = []
+    wheel = -1 # Index of the wheel event in result
+    prev_type = None
+    for e in events:
+        if e.type == pg.MOUSEMOTION and prev_type == pg.MOUSEMOTION:
+            rel = result[-1].rel
+            result[-1] = pg.Event(pg.MOUSEMOTION, {**e.dict, 'rel': (rel[0] + e.rel[0], rel[1] + e.rel[1])})
+        elif e.type == pg.MOUSEWHEEL and wheel != -1:
+            first = result[wheel]
+            result[wheel] = pg.Event(pg.MOUSEWHEEL, {
+                **first.dict, 'x': first.x + e.x, 'y': first.y + e.y,
+                'precise_x': first.precise_x + e.precise_x, 'precise_y': first.precise_y + e.precise_y,
+            })
+        else:
+            if e.type == pg.MOUSEWHEEL:
+                wheel = len(result)
+            result.append(e)
+        prev_type = e.type
+
+    return result
 
 class Input():
     def __init__(self):
@@ -22,31 +55,41 @@ class Input():
             actions.m3d: [],
             actions.m3u: [],
             actions.mouse_move: [],
-            actions.mwheel: []
+            actions.mwheel: [],
+            actions.key_down: [],
+            actions.key_up: [],
+            actions.text_input: []
         }
+        self.batch_subs = {action: [] for action in self.subs} # Called once per update with the events' dicts
+        self.coalesce = False # Merge each update's motion and wheel events with coalesce_events
         self.was_hovered = []
+        self._hover_state = None # (root, mouse pos, layout generation) was_hovered was found for
+        self.focused = None # Element key events are sent to
+        self._tab_order = [] # Visible focusable elements in tree order
+        self._tab_index = {} # Element -> index in _tab_order
+        self._tab_state = None # (root, structure generation) _tab_order was found for
 
     @property
     def hovered(self): return self.was_hovered
 
     def update(self, root=None):
-        self.mpos.update(pg.mouse.get_pos())
-
-        if root:
-            hovered = root.get_hovered(self.mpos)
-            was_hovered = set(self.was_hovered)
-            # Newly hovered items
-            for e in set(hovered) - was_hovered:
-                e.hovered = True
-                e.on_mouse_enter()
-            # Newly unhovered items
-            for e in was_hovered - set(hovered):
-                e.hovered = False
-                e.on_mouse_exit()
-
-            self.was_hovered = hovered
-
-        for e in pg.event.get(pump=False):
+        profiler.run('input', self._update, root)
+
+    def _update(self, root=None):
+        pos = pg.mouse.get_pos()
+        self.mpos.update(pos)
+
+        # Only hit test when the mouse moved or the layout changed
+        if root and (state := (root, pos, layout_generation())) != self._hover_state:
+            self._hover_state = state
+            self.update_hovered(root.get_hovered(self.mpos))
+
+        events = pg.event.get(pump=False)
+        if self.coalesce:
+            events = coalesce_events(events)
+
+        batches: dict[actions, list[dict]] = {}
+        for e in events:
             action = None
             match e.type:
                 case pg.MOUSEBUTTONDOWN:
@@ -71,22 +114,149 @@ class Input():
                 case pg.MOUSEWHEEL:
                     action = actions.mwheel
 
+                case pg.KEYDOWN:
+                    if e.key == pg.K_TAB and root: # Move the focus, elements don't see tabs
+                        self.focus_next(root, -1 if e.mod & pg.KMOD_SHIFT else 1)
+                    else:
+                        action = actions.key_down
+
+                case pg.KEYUP:
+                    if not (e.key == pg.K_TAB and root):
+                        action = actions.key_up
+
+                case pg.TEXTINPUT:
+                    action = actions.text_input
+
             if action:
+                start = time.perf_counter() if profiler.enabled else None
+                event = e.dict
+                if action in key_actions:
+                    if self.focused is not None:
+                        self.dispatch(action, event, self.focused)
+                elif self.was_hovered:
+                    if action == actions.m1d and root:
+                        self.focus_hovered()
+                    self.dispatch(action, event, self.was_hovered[0])
                 for cb in self.subs[action]:
-                    cb(**e.dict)
+                    cb(**event)
+                if self.batch_subs[action]:
+                    batches.setdefault(action, []).append(event)
+                if start is not None:
+                    profiler.add('input.callbacks', (time.perf_counter() - start) * 1000)
+
+        for action, batch in batches.items():
+            start = time.perf_counter() if profiler.enabled else None
+            for cb in self.batch_subs[action]:
+                cb(batch)
+            if start is not None:
+                profiler.add('input.callbacks', (time.perf_counter() - start) * 1000)
+
+    def update_hovered(self, hovered: list):
+        """Call on_mouse_exit/enter on the elements that stopped/started being hovered.
 
-    def sub(self, action, callback):
+        Hovered elements are mostly the path from the root to the deepest one, so the lists
+        are usually only compared past their common root side. Overlapping siblings can be
+        in both lists at different places, so what's left is compared by identity."""
+        was_hovered = self.was_hovered
+        i, j = len(was_hovered), len(hovered)
+        while i and j and was_hovered[i - 1] is hovered[j - 1]:
+            i -= 1
+            j -= 1
+
+        old, new = was_hovered[:i], hovered[:j]
+        if old and new:
+            still = set(old) & set(new)
+            old = [e for e in old if e not in still]
+            new = [e for e in new if e not in still]
+
+        for e in old:
+            e.hovered = False
+            e.on_mouse_exit()
+        for e in reversed(new):
+            e.hovered = True
+            e.on_mouse_enter()
+
+        self.was_hovered = hovered
+
+    def focus(self, e):
+        """Send key events to the element, or to nothing if it's None"""
+        if e is self.focused:
+            return
+
+        if self.focused is not None:
+            self.focused.focused = False
+            self.focused.on_blur()
+        self.focused = e
+        if e is not None:
+            e.focused = True
+            e.on_focus()
+
+    def focus_hovered(self):
+        """Focus the deepest focusable hovered element or ancestor of it, or nothing"""
+        e = self.was_hovered[0] if self.was_hovered else None
+        while e is not None and not e.focusable:
+            e = e.parent
+        self.focus(e)
+
+    def tab_order(self, root) -> list:
+        """Returns the visible focusable elements in tree order, found again after elements
+        are added, removed, shown, hidden or made focusable"""
+        if (state := (root, structure_generation())) != self._tab_state:
+            self._tab_state = state
+            order = []
+            stack = [root]
+            while stack:
+                e = stack.pop()
+                if not e.visible: # Hides its descendants too
+                    continue
+                if e.focusable:
+                    order.append(e)
+                stack.extend(reversed(e.children))
+            self._tab_order = order
+            self._tab_index = {e: i for i, e in enumerate(order)}
+        return self._tab_order
+
+    def focus_next(self, root, step: int = 1):
+        """Move the focus `step` elements along the tab order, wrapping around"""
+        order = self.tab_order(root)
+        if not order:
+            return
+
+        i = self._tab_index.get(self.focused)
+        if i is None:
+            i = 0 if step > 0 else len(order) - 1
+        else:
+            i = (i + step) % len(order)
+        self.focus(order[i])
+
+    def dispatch(self, action, event: dict, target):
+        """Call the `listen` callbacks for the action on the target, then its ancestors"""
+        e = target
+        while e is not None:
+            if e.handlers and action in e.handlers:
+                stop = False
+                for cb in tuple(e.handlers[action]): # Callbacks may unlisten
+                    if cb(target=target, **event):
+                        stop = True
+                if stop:
+                    return
+            e = e.parent
+
+    def sub(self, action, callback, batched=False):
+        """Call `callback(**event)` for each event of the action, or if `batched`,
+        `callback(events)` once per update with the list of the events' dicts"""
         if action not in self.subs:
             raise ValueError(f"Tried to subscribe to invalid action {action}")
 
-        self.subs[action].append(callback)
+        (self.batch_subs if batched else self.subs)[action].append(callback)
 
-    def unsub(self, action, cb):
-        if action not in self.subs:
+    def unsub(self, action, cb, batched=False):
+        subs = self.batch_subs if batched else self.subs
+        if action not in subs:
             print(f"Tried to unsubscribe from invalid action {action}")
-        elif cb not in self.subs[action]:
+        elif cb not in subs[action]:
             print(f"{cb} not found in {action} subscriptions")
 
-        self.subs[action].remove(cb)
+        subs[action].remove(cb)
 
 input = Input()
@@ -1,38 +1,203 @@
 from .element import *
+from .profiler import profiler
 
 def update_elements_r(e: Element):
     """Recursively update elements"""
+    run = profiler.run
     # Size elements
-    set_widths_r(e)
-    grow_widths_r(e)
-    set_heights_r(e)
-    grow_heights_r(e)
+    run('layout.set_widths', set_widths_r, e)
+    run('layout.grow_widths', grow_widths_r, e)
+    run('layout.set_heights', set_heights_r, e)
+    run('layout.grow_heights', grow_heights_r, e)
 
     # Position elements
-    position_r(e)
+    run('layout.position', position_r, e)
 
     # Make their surfaces
-    make_surface_r(e)
+    run('layout.make_surfaces', make_surface_r, e)
 
-def set_widths_r(e: Element):
-    """Recursively set fixed and shrink widths"""
-    # Have to fix the widths of children first
+    layout_changed()
+
+def update_elements(e: Element):
+    """Update elements like update_elements_r, without recursing.
+
+    The passes loop over a depth first list of the tree, so its depth isn't limited
+    by the recursion limit. Growing heights and positioning share a loop."""
+    order = preorder(e)
+    run = profiler.run
+    run('layout.set_widths', set_widths, order)
+    run('layout.grow_widths', grow_widths, order)
+    run('layout.set_heights', set_heights, order)
+    run('layout.grow_heights_position', grow_heights_position, order)
+
+    run('layout.make_surfaces', make_surfaces, e)
+
+    layout_changed()
+
+def set_widths(order: list[Element]):
+    """Set fixed and shrink widths, children first"""
+    for e in reversed(order):
+        set_width(e)
+
+def grow_widths(order: list[Element]):
+    """Grow child widths, parents first"""
+    for e in order:
+        grow_width(e)
+
+def set_heights(order: list[Element]):
+    """Set fixed and shrink heights, children first"""
+    for e in reversed(order):
+        set_height(e)
+
+def grow_heights_position(order: list[Element]):
+    """Grow child heights and position the children, parents first"""
+    for e in order:
+        if e.children:
+            grow_height(e)
+            align(e)
+            justify(e)
+
+def update_dirty_r(e: Element):
+    """Recursively update only the elements marked dirty and the ones affected by them.
+
+    Measures the dirty elements, then relays out their children top-down, only going
+    into clean children whose size or position changed as a result."""
+    if not e.dirty:
+        return
+
+    run = profiler.run
+    run('layout.set_widths', set_widths_dirty_r, e)
+    run('layout.grow_widths', grow_widths_dirty_r, e)
+    run('layout.set_heights', set_heights_dirty_r, e)
+    run('layout.grow_heights', grow_heights_dirty_r, e)
+
+    moved = []
+    run('layout.position', position_dirty_r, e, moved)
+
+    relaid = []
+    run('layout.make_surfaces', make_surface_dirty_r, e, relaid)
+
+    layout_changed(relaid, moved)
+
+def update_dirty(e: Element):
+    """Update the dirty elements like update_dirty_r, without recursing.
+
+    The passes loop over stacks of the elements to go into, so the tree's depth isn't
+    limited by the recursion limit."""
+    if not e.dirty:
+        return
+
+    run = profiler.run
+    run('layout.set_widths', set_widths, dirty_preorder(e))
+    run('layout.grow_widths', visit, e, grow_width_dirty)
+    run('layout.set_heights', set_heights, dirty_preorder(e))
+    run('layout.grow_heights', visit, e, grow_height_dirty)
+
+    moved = []
+    run('layout.position', position_dirty_all, e, moved)
+
+    relaid = []
+    run('layout.make_surfaces', make_surfaces_dirty, e, relaid)
+
+    layout_changed(relaid, moved)
+
+def dirty_preorder(e: Element) -> list[Element]:
+    """Returns the dirty elements reachable through dirty parents, each before its children"""
+    result = []
+    stack = [e]
+    while stack:
+        e = stack.pop()
+        if e.dirty:
+            result.append(e)
+            stack.extend(reversed(e.children))
+
+    return result
+
+def visit(e: Element, step):
+    """Call `step` on the element, then on the children it returns, parents first"""
+    stack = [e]
+    while stack:
+        stack.extend(reversed(step(stack.pop())))
+
+def position_dirty_all(e: Element, moved: list):
+    """Position the children of dirty elements like position_dirty_r, without recursing"""
+    stack = [e]
+    while stack:
+        dirty, moved_children = position_dirty(stack.pop())
+        stack.extend(reversed(dirty))
+        for c in moved_children:
+            for d in preorder(c):
+                if d.children:
+                    align(d)
+                    justify(d)
+        moved += moved_children
+
+def make_surfaces_dirty(e: Element, relaid: list):
+    """Make the textures of dirty elements like make_surface_dirty_r, without recursing.
+
+    Children are checked once their parent is made, its on_layout hook can replace them"""
+    stack = [e]
+    while stack:
+        e = stack.pop()
+        if e.dirty:
+            make_surface(e)
+            relaid.append(e)
+            stack.extend(reversed(e.children))
+
+def update_children_r(e: Element):
+    """Recursively update the element's descendants, keeping its own size and position"""
     for c in e.children:
         set_widths_r(c)
+    grow_width(e)
+    for c in e.children:
+        grow_widths_r(c)
+
+    for c in e.children:
+        set_heights_r(c)
+    grow_height(e)
+    for c in e.children:
+        grow_heights_r(c)
+
+    position_r(e)
+
+    for c in e.children:
+        make_surface_r(c)
+
+    layout_changed(subtrees=[e])
 
+def set_width(e: Element):
+    """Set a fixed or shrink width from the children's measured widths"""
     if e.sizing_w > 0: # If element is set to grow
         e.width = 0
-        return
     elif e.sizing_w == shrink:
         if e.horizontal:
             # Width is made of padding, child gap, and sum of child widths
-            e.width = sum(e.padding[:2]) + e.child_gap * (len(e.children) - 1) + sum([c.width for c in e.children])
+            e.width = sum(e.padding[:2]) + e.child_gap * (len(e.children) - 1) + sum([c._measured_w for c in e.children])
         else:
-            e.width = sum(e.padding[:2]) + max([c.width for c in e.children])
+            e.width = sum(e.padding[:2]) + max([c._measured_w for c in e.children], default=0)
 
-def grow_widths_r(e: Element):
-    """Recursively grow child widths."""
-    # TODO: Text and wrapping text
+    e._measured_w = e.width
+
+def set_widths_r(e: Element):
+    """Recursively set fixed and shrink widths"""
+    # Have to fix the widths of children first
+    for c in e.children:
+        set_widths_r(c)
+
+    set_width(e)
+
+def set_widths_dirty_r(e: Element):
+    """Recursively set the fixed and shrink widths of dirty elements"""
+    if not e.dirty:
+        return
+
+    for c in e.children:
+        set_widths_dirty_r(c)
+
+    set_width(e)
+
+def grow_width(e: Element):
+    """Grow the element's children's widths"""
     if not e.children: # No children to grow
         return
 
@@ -86,26 +251,75 @@ def grow_widths_r(e: Element):
 
             remaining_space -= curr_space_used
 
+def grow_widths_r(e: Element):
+    """Recursively grow child widths."""
+    grow_width(e)
+
     for c in e.children:
         grow_widths_r(c)
 
+def grow_width_dirty(e: Element) -> list[Element]:
+    """Grow the child widths of a dirty element, returns the children to go into.
+
+    Clean children are reset to their measured width before growing, and are only
+    gone into if their width changed."""
+    if not e.dirty or not e.children:
+        return []
+
+    was_dirty = [c.dirty for c in e.children]
+    old_widths = [c.width for c in e.children]
+    for c, dirty in zip(e.children, was_dirty):
+        if not dirty:
+            c.width = c._measured_w
+
+    grow_width(e)
+
+    changed = []
+    for c, dirty, w in zip(e.children, was_dirty, old_widths):
+        if not dirty and c.width == w:
+            c._dirty = False # Only changed by the reset above
+        else:
+            changed.append(c)
+    return changed
+
+def grow_widths_dirty_r(e: Element):
+    """Recursively grow the child widths of dirty elements"""
+    for c in grow_width_dirty(e):
+        grow_widths_dirty_r(c)
+
+def set_height(e: Element):
+    """Set a fixed or shrink height from the children's measured heights"""
+    e.fit_height()
+
+    if e.sizing_h > 0:
+        e.height = 0
+    elif e.sizing_h == shrink:
+        if e.horizontal:
+            e.height = sum(e.padding[2:]) + max([c._measured_h for c in e.children], default=0)
+        else:
+            e.height = sum(e.padding[2:]) + sum([c._measured_h for c in e.children]) + (len(e.children) - 1) * e.child_gap
+
+    e._measured_h = e.height
+
 def set_heights_r(e: Element):
     """Recursively set fixed and shrink heights"""
     for c in e.children:
         set_heights_r(c)
 
-    if e.sizing_h > 0:
-        e.height = 0
+    set_height(e)
+
+def set_heights_dirty_r(e: Element):
+    """Recursively set the fixed and shrink heights of dirty elements"""
+    if not e.dirty:
         return
-    elif e.sizing == shrink:
-        if e.horizontal:
-            e.height = sum(e.padding[2:]) + max([c.height for c in e.children])
-        else:
-            e.height = sum(e.padding[2:]) + sum([c.height for c in e.children]) + (len(e.children) - 1) * e.child_gap
 
-def grow_heights_r(e: Element):
-    """Recursively grow child heights"""
-    # TODO: Text and wrapping text
+    for c in e.children:
+        set_heights_dirty_r(c)
+
+    set_height(e)
+
+def grow_height(e: Element):
+    """Grow the element's children's heights"""
     if not e.children: # No children to grow
         return
 
@@ -156,9 +370,39 @@ def grow_heights_r(e: Element):
 
             remaining_space -= curr_space_used
 
+def grow_heights_r(e: Element):
+    """Recursively grow child heights"""
+    grow_height(e)
+
     for c in e.children:
         grow_heights_r(c)
 
+def grow_height_dirty(e: Element) -> list[Element]:
+    """Grow the child heights of a dirty element, returns the children to go into"""
+    if not e.dirty or not e.children:
+        return []
+
+    was_dirty = [c.dirty for c in e.children]
+    old_heights = [c.height for c in e.children]
+    for c, dirty in zip(e.children, was_dirty):
+        if not dirty:
+            c.height = c._measured_h
+
+    grow_height(e)
+
+    changed = []
+    for c, dirty, h in zip(e.children, was_dirty, old_heights):
+        if not dirty and c.height == h:
+            c._dirty = False
+        else:
+            changed.append(c)
+    return changed
+
+def grow_heights_dirty_r(e: Element):
+    """Recursively grow the child heights of dirty elements"""
+    for c in grow_height_dirty(e):
+        grow_heights_dirty_r(c)
+
 def position_r(e: Element):
     """Recursively position each element's children"""
     # Position all elements in relation to e
@@ -171,6 +415,49 @@ def position_r(e: Element):
     for c in e.children:
         position_r(c)
 
+def position_dirty(e: Element) -> tuple[list[Element], list[Element]]:
+    """Position the children of a dirty element, returns its dirty children to go into
+    and the clean ones that moved, whose whole subtree has to be repositioned"""
+    if not e.dirty or not e.children:
+        return [], []
+
+    old_positions = [(c.left, c.top) for c in e.children]
+
+    align(e)
+    justify(e)
+
+    dirty, moved = [], []
+    for c, (x, y) in zip(e.children, old_positions):
+        if c.dirty:
+            dirty.append(c)
+        elif c.left != x or c.top != y:
+            moved.append(c)
+    return dirty, moved
+
+def position_dirty_r(e: Element, moved: list | None = None):
+    """Recursively position the children of dirty elements.
+
+    Clean children that moved get their whole subtree repositioned, and are added to `moved`."""
+    dirty, moved_children = position_dirty(e)
+    for c in dirty:
+        position_dirty_r(c, moved)
+    for c in moved_children:
+        position_r(c)
+    if moved is not None:
+        moved += moved_children
+
+def make_surface_dirty_r(e: Element, relaid: list | None = None):
+    """Recursively make the textures of dirty elements, adding them to `relaid`"""
+    if not e.dirty:
+        return
+
+    make_surface(e)
+    if relaid is not None:
+        relaid.append(e)
+
+    for c in e.children:
+        make_surface_dirty_r(c, relaid)
+
 def align(e: Element):
     """Align the element's children"""
     if e.align == start:
@@ -223,7 +510,7 @@ def justify(e: Element):
             curr_y = e.bottom - e.padding[3]
             for c in reversed(e.children):
                 c.bottom = curr_y
-                curr_y = c.height + e.child_gap
+                curr_y -= c.height + e.child_gap
     elif e.justify == center:
         if e.horizontal:
             child_total_widths = e.child_gap * (len(e.children) - 1) + sum(c.width for c in e.children)
@@ -265,7 +552,12 @@ def justify(e: Element):
                 curr_y += space_size * 2 + c.height
 
     elif e.justify == space_between:
-        if e.horizontal:
+        if len(e.children) == 1: # No space to put between, same as start
+            if e.horizontal:
+                e.children[0].left = e.left + e.padding[0]
+            else:
+                e.children[0].top = e.top + e.padding[2]
+        elif e.horizontal:
             num_spaces = len(e.children) - 1
             remaining_space = e.width - sum(c.width for c in e.children) - sum(e.padding[:2])
             space_size = remaining_space / num_spaces
@@ -277,7 +569,7 @@ def justify(e: Element):
             num_spaces = len(e.children) - 1
             remaining_space = e.height - sum(c.height for c in e.children) - sum(e.padding[2:])
             space_size = remaining_space / num_spaces
-            curr_y = e.top + e.padding[0]
+            curr_y = e.top + e.padding[2]
             for c in e.children:
                 c.top = curr_y
                 curr_y += c.height + space_size
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from .element import *
+from .flat_layout import (FlatTree, set_widths_flat, grow_widths_flat, fit_heights_flat,
+                          set_heights_flat, grow_heights_flat, position_flat)
+from .profiler import profiler
+
+def layout_widths(t: FlatTree):
+    set_widths_flat(t)
+    grow_widths_flat(t)
+
+def layout_heights(t: FlatTree):
+    set_heights_flat(t, fit=False)
+    grow_heights_flat(t)
+    position_flat(t)
+
+def clean_r(e: Element):
+    """Clear the dirty flags of the element and its dirty ancestors"""
+    while e is not None and e._dirty:
+        e._dirty = False
+        e = e.parent
+
+class LayoutWorker():
+    """Lays out a tree on a worker thread, while the main thread keeps drawing its previous layout.
+
+    `request(root)` snapshots the tree's layout inputs into a FlatTree, and the layout
+    passes run over the snapshot's arrays on the worker. `poll()`, called once per frame,
+    swaps the result into the elements when it's ready and makes their textures, so
+    elements only change on the main thread. Elements overriding `fit_height`, like
+    wrapped Text, are measured on the main thread between the width and height passes.
+
+    If the tree is changed while it's being laid out, the result is dropped and the tree
+    is laid out again."""
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pgui-layout')
+        self._future = None
+        self._tree: FlatTree | None = None
+        self._root: Element | None = None
+        self._next: Element | None = None # Requested while busy
+        self._heights = False # Whether the running job is the height passes
+
+    @property
+    def busy(self): return self._future is not None
+
+    def request(self, root: Element):
+        """Start laying out the tree, or once the running layout finishes if busy"""
+        if self._future is not None:
+            self._next = root
+        else:
+            self._start(root)
+
+    def _start(self, root: Element):
+        self._root = root
+        self._next = None
+        self._tree = tree = profiler.run('layout.snapshot', FlatTree, root)
+        # Changes made while laying out mark the root dirty again
+        for e in tree.elements:
+            e._dirty = False
+
+        self._heights = False
+        self._future = self._executor.submit(layout_widths, tree)
+
+    def poll(self) -> bool:
+        """Swap in the finished layout, returns True if the elements were updated"""
+        future = self._future
+        if future is None or not future.done():
+            return False
+
+        self._future = None
+        future.result() # Raise the worker's exceptions here
+        tree, root = self._tree, self._root
+        if self._next is not None or root._dirty: # Stale
+            self._start(self._next or root)
+            return False
+
+        if not self._heights:
+            fit_heights_flat(tree, keep_size=True)
+            for i, fits in enumerate(tree.fits_height):
+                if fits:
+                    clean_r(tree.elements[i])
+
+            self._heights = True
+            self._future = self._executor.submit(layout_heights, tree)
+            return False
+
+        self._tree = None
+        tree.write_back()
+        profiler.run('layout.make_surfaces', make_surfaces, root)
+        layout_changed()
+        return True
+
+    def wait(self):
+        """Block until the requested layout is swapped in"""
+        while self._future is not None:
+            wait((self._future,))
+            self.poll()
+
+    def close(self):
+        """Stop the worker thread, dropping the layout in progress"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._future = None
+        self._tree = None
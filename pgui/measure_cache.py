@@ -0,0 +1,155 @@
+from .element import *
+from .layout import set_width, grow_width, set_height, grow_height, align, justify
+from .profiler import profiler
+
+class MeasureCache():
+    """Layout results of the subtrees laid out so far in an update, by their structure.
+
+    Subtrees get the same id when their elements' `layout_style()`s and their children's
+    ids are equal, so they lay out the same way given the same size. The ids are worked
+    out again for every update, so changing any layout input gives a subtree a new one."""
+    def __init__(self):
+        self.ids: dict[tuple, int] = {} # (style, child ids) -> id
+        self.keys: dict[Element, int] = {} # Element -> id, for elements with children whose subtree has one
+        self.widths: dict[int, tuple[float, float]] = {} # id -> width, measured width
+        self.heights: dict[tuple[int, float], tuple[float, float]] = {} # (id, width) -> height, measured height
+        self.arranged: dict[tuple[int, float, float], Element] = {} # (id, width, height) -> laid out element
+        self.clones: set[Element] = set() # Elements measured from the cache, their subtree isn't laid out
+
+    def key_r(self, e: Element) -> int | None:
+        """Recursively give the element and its descendants their ids"""
+        ids = [self.key_r(c) for c in e._children]
+        style = e.layout_style()
+        if style is None or None in ids:
+            return None
+
+        signature = (style, tuple(ids))
+        key = self.ids.get(signature)
+        if key is None:
+            key = self.ids[signature] = len(self.ids)
+        if ids: # Leaves are quicker to lay out than to copy
+            self.keys[e] = key
+        return key
+
+def update_elements_cached(e: Element):
+    """Update elements like update_elements_r, laying out each distinct subtree once.
+
+    Subtrees identical to one already laid out, like the rows of a list, take its
+    measured size and, if they end up the same size, its layout, offset to their
+    position. Subtrees containing elements that override fit_height without
+    layout_style are always laid out."""
+    cache = MeasureCache()
+    run = profiler.run
+    run('layout.keys', cache.key_r, e)
+    run('layout.set_widths', set_widths_cached_r, e, cache)
+    run('layout.grow_widths', grow_widths_cached_r, e, cache)
+    run('layout.set_heights', set_heights_cached_r, e, cache)
+    run('layout.grow_heights', grow_heights_cached_r, e, cache)
+    run('layout.position', position_cached_r, e, cache)
+
+    run('layout.make_surfaces', make_surface_r, e)
+
+    layout_changed()
+
+def set_widths_cached_r(e: Element, cache: MeasureCache):
+    """Recursively set fixed and shrink widths, taking them from the cache for repeated subtrees"""
+    key = cache.keys.get(e)
+    if key is not None:
+        cached = cache.widths.get(key)
+        if cached is not None:
+            e._size.x, e._measured_w = cached
+            cache.clones.add(e)
+            return
+
+    for c in e.children:
+        set_widths_cached_r(c, cache)
+
+    set_width(e)
+    if key is not None:
+        cache.widths[key] = (e.width, e._measured_w)
+
+def grow_widths_cached_r(e: Element, cache: MeasureCache):
+    """Recursively grow child widths, skipping the subtrees of clones"""
+    if e in cache.clones:
+        return
+
+    grow_width(e)
+    for c in e.children:
+        grow_widths_cached_r(c, cache)
+
+def layout_widths_cached(e: Element, cache: MeasureCache):
+    """Lay out the widths below a clone that's no longer one"""
+    cache.clones.discard(e)
+    for c in e.children:
+        set_widths_cached_r(c, cache)
+    grow_width(e)
+    for c in e.children:
+        grow_widths_cached_r(c, cache)
+
+def set_heights_cached_r(e: Element, cache: MeasureCache):
+    """Recursively set fixed and shrink heights, taking them from the cache for clones at a cached width"""
+    key = cache.keys.get(e)
+    if e in cache.clones:
+        cached = cache.heights.get((key, e.width))
+        if cached is not None:
+            e._size.y, e._measured_h = cached
+            return
+        layout_widths_cached(e, cache) # Grown to a new width
+
+    for c in e.children:
+        set_heights_cached_r(c, cache)
+
+    set_height(e)
+    if key is not None:
+        cache.heights.setdefault((key, e.width), (e.height, e._measured_h))
+
+def grow_heights_cached_r(e: Element, cache: MeasureCache):
+    """Recursively grow child heights, skipping the subtrees of clones"""
+    if e in cache.clones:
+        return
+
+    grow_height(e)
+    for c in e.children:
+        grow_heights_cached_r(c, cache)
+
+def position_cached_r(e: Element, cache: MeasureCache):
+    """Recursively position children, copying the layout of an identical subtree of the same size into clones"""
+    key = cache.keys.get(e)
+    if key is not None:
+        arranged = (key, e.width, e.height)
+        if e in cache.clones:
+            other = cache.arranged.get(arranged)
+            if other is not None:
+                copy_layout_r(e, other)
+                return
+
+            # Grown to a new size, lay out its subtree
+            layout_widths_cached(e, cache)
+            for c in e.children:
+                set_heights_cached_r(c, cache)
+            grow_height(e)
+            for c in e.children:
+                grow_heights_cached_r(c, cache)
+
+        cache.arranged.setdefault(arranged, e)
+
+    if not e.children:
+        return
+
+    align(e)
+    justify(e)
+
+    for c in e.children:
+        position_cached_r(c, cache)
+
+def copy_layout_r(e: Element, other: Element):
+    """Copy the layout of an identical, laid out subtree, offset to the element's position"""
+    dx = e.position.x - other.position.x
+    dy = e.position.y - other.position.y
+    e.copy_layout(other)
+    stack = list(zip(e._children, other._children))
+    while stack:
+        c, o = stack.pop()
+        c.copy_layout(o)
+        c.position.update(o.position.x + dx, o.position.y + dy)
+        stack.extend(zip(c._children, o._children))
@@ -0,0 +1,62 @@
+import time
+from math import ceil
+from typing import Deque
+
+class Profiler():
+    """Opt-in frame instrumentation.
+
+    While `enabled`, instrumented sections add their milliseconds and counters add their
+    counts to the current frame. `end_frame` pushes the frame, along with its total
+    time, into a ring buffer of the last `max_frames` frames that percentiles are read from."""
+    def __init__(self, max_frames: int = 240):
+        self.enabled = False
+        self.frames: Deque[dict[str, float]] = Deque(maxlen=max_frames)
+        self.current: dict[str, float] = {}
+        self._frame_start: float | None = None
+
+    def run(self, name: str, f, *args):
+        """Call f(*args), timing it as a section of the frame if enabled"""
+        if not self.enabled:
+            return f(*args)
+
+        start = time.perf_counter()
+        result = f(*args)
+        self.add(name, (time.perf_counter() - start) * 1000)
+        return result
+
+    def add(self, name: str, value: float = 1):
+        """Add to a section time or counter of the current frame"""
+        self.current[name] = self.current.get(name, 0) + value
+
+    def end_frame(self):
+        """Push the current frame into the ring buffer and start a new one"""
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self.current['frame'] = (now - self._frame_start) * 1000
+        self._frame_start = now
+
+        self.frames.append(self.current)
+        self.current = {}
+
+    def names(self) -> list[str]:
+        """Returns the names of the sections and counters recorded in the buffered frames"""
+        return sorted({name for frame in self.frames for name in frame})
+
+    def percentiles(self, name: str, ps=(50, 95, 99)) -> list[float]:
+        """Returns the nearest rank percentiles of a section or counter over the buffered frames"""
+        values = sorted(frame.get(name, 0) for frame in self.frames)
+        if not values:
+            return [0 for _ in ps]
+
+        n = len(values)
+        return [values[min(n - 1, max(0, ceil(p / 100 * n) - 1))] for p in ps]
+
+    def reset(self):
+        self.frames.clear()
+        self.current = {}
+        self._frame_start = None
+
+profiler = Profiler()
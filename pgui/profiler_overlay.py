@@ -0,0 +1,39 @@
+from .element import Element, start, shrink
+from .text_element import Text
+from .profiler import profiler
+from .fonts import fonts
+
+class ProfilerOverlay(Element):
+    """Lists the profiler's p50/p95/p99 for each section and counter, one Text per line.
+
+    Call `update` after `profiler.end_frame`, it only refreshes every `interval` calls."""
+    __slots__ = ('font', 'colour', 'interval', '_calls', '_lines')
+
+    def __init__(self, font=None, colour=(255, 255, 255), interval: int = 30, **args):
+        args.setdefault('background', (0, 0, 0, 160))
+        args.setdefault('padding', [4, 4, 4, 4])
+        super().__init__(**args)
+        self.horizontal = False
+        self.sizing = (shrink, shrink)
+        self.align = start
+        self.font = fonts.resolve(font)
+        self.colour = colour
+        self.interval = interval
+        self._calls = 0
+        self._lines: dict[str, Text] = {}
+
+    def update(self):
+        self._calls += 1
+        if self._calls < self.interval:
+            return
+        self._calls = 0
+
+        for name in profiler.names():
+            line = self._lines.get(name)
+            if line is None:
+                line = Text(text="", font=self.font, colour=self.colour, glyphs=True)
+                self._lines[name] = line
+                self.add_child(line)
+
+            p50, p95, p99 = profiler.percentiles(name)
+            line.text = f"{name:<22}{p50:9.2f}{p95:9.2f}{p99:9.2f}"
@@ -0,0 +1,123 @@
+from types import MemberDescriptorType
+from .element import Element, free_surface_r, release_surface
+
+class Node():
+    """Description of an element for `reconcile`: its class, constructor arguments and children.
+
+    `key` identifies the node among its siblings, so the element made for it is kept
+    when siblings are added, removed or reordered. Without keys, children are matched
+    by position. Children of None leave the element's children as they are, for
+    elements managing their own, like ScrollView."""
+    __slots__ = ('type', 'key', 'props', 'children')
+
+    def __init__(self, type: type = Element, key=None, children: list["Node"] | None = (), **props):
+        self.type = type
+        self.key = key
+        self.props = props
+        self.children = children
+
+# Kinds of props, see settable
+_fixed = 0 # Can only be passed to the constructor
+_setter = 1 # A property with a setter or one of Element's plain attributes
+_callback = 2 # A plain attribute, settable when its value is callable
+
+# (class, name) -> kind of prop
+_settable: dict[tuple[type, str], int] = {}
+
+def settable(cls: type, name: str, value=None) -> bool:
+    """True if setting the attribute on an existing element has the same effect as passing
+    it to the constructor: a property with a setter, one of Element's plain attributes, or
+    a callback kept in a plain attribute, like ScrollView's `make_row`"""
+    key = (cls, name)
+    kind = _settable.get(key)
+    if kind is None:
+        attr = getattr(cls, name, None)
+        if isinstance(attr, property):
+            kind = _setter if attr.fset is not None else _fixed
+        elif name in Element._init_args:
+            kind = _setter
+        elif isinstance(attr, MemberDescriptorType) and not name.startswith('_'):
+            kind = _callback
+        else:
+            kind = _fixed
+        _settable[key] = kind
+
+    return kind == _setter or (kind == _callback and callable(value))
+
+def patch(e: Element, node: Node) -> bool:
+    """Set the props that changed since the element was last reconciled.
+
+    Returns False without changing anything if a prop was removed or can't be set,
+    and the element has to be made again."""
+    old = e._node.props if e._node is not None else {}
+    if any(name not in node.props for name in old):
+        return False
+
+    changed = [(name, value) for name, value in node.props.items() if name not in old or old[name] != value]
+    cls = type(e)
+    if not all(settable(cls, name, value) for name, value in changed):
+        return False
+
+    for name, value in changed:
+        setattr(e, name, value)
+    return True
+
+def reconcile(e: Element | None, node: Node) -> Element:
+    """Returns an element tree matching the description, updating the given tree in place.
+
+    Elements are kept when their node has the same type and key, with only the props
+    that changed set on them, so their textures and other caches are kept too. Elements
+    are made again when their type or key changed, a prop was removed, or a prop that
+    can only be passed to the constructor changed. Callbacks are set in place, so inline
+    lambdas don't make the element again. Removed elements' textures are
+    returned to the pool. Call `update_dirty_r` on the result afterwards."""
+    old_children = []
+    if e is not None and type(e) is node.type and patch(e, node):
+        old_children = e.children
+    else:
+        if e is not None: # Made again, its children can still be reused
+            old_children = e.children
+            e._children = [] # So freeing it doesn't free them
+            if e.surface is not None:
+                release_surface(e)
+        e = node.type(**node.props)
+    e._node = node
+
+    if node.children is not None:
+        reconcile_children(e, old_children, node.children)
+
+    return e
+
+def reconcile_children(e: Element, old: list[Element], nodes: list[Node]):
+    """Match the nodes with the old children by key, or by position among the unkeyed ones,
+    and set the element's children if they changed"""
+    keyed = {}
+    unkeyed = []
+    for c in old:
+        key = c._node.key if c._node is not None else None
+        if key is None:
+            unkeyed.append(c)
+        else:
+            keyed[key] = c
+
+    children = []
+    next_unkeyed = 0
+    for node in nodes:
+        if node.key is not None:
+            c = keyed.pop(node.key, None)
+        elif next_unkeyed < len(unkeyed):
+            c = unkeyed[next_unkeyed]
+            next_unkeyed += 1
+        else:
+            c = None
+        children.append(reconcile(c, node))
+
+    kept = set(children)
+    for c in old:
+        if c not in kept:
+            c.parent = None
+            free_surface_r(c)
+
+    current = e.children
+    if len(children) != len(current) or any(c is not o for c, o in zip(children, current)):
+        e.children = children
@@ -0,0 +1,200 @@
+import pygame as pg
+import weakref
+from .element import Element, blit_batch, listen_draw_changes, unlisten_draw_changes
+from .profiler import profiler
+
+def merge_rects(rects: list[pg.Rect]) -> list[pg.Rect]:
+    """Merge overlapping rects into their unions"""
+    merged: list[pg.Rect] = []
+    for r in rects:
+        if not r.w or not r.h:
+            continue
+
+        r = r.copy()
+        i = r.collidelist(merged)
+        while i != -1:
+            r.union_ip(merged.pop(i))
+            i = r.collidelist(merged)
+        merged.append(r)
+
+    return merged
+
+class DirtyRenderer():
+    """Retained renderer that only redraws where elements changed since the last frame.
+
+    An element is damaged when its rect, texture, visibility, offset or opacity changed,
+    or its texture was composited again. The renderer keeps every element's draw state
+    and only looks at the elements passed to `draw_changed` since the last frame, and at
+    their descendants when where or how they're drawn changed, so a frame where nothing
+    changed does nothing. Damaged areas are cleared and every element intersecting them
+    is redrawn in tree order, skipping elements outside the surface or their clipping
+    ancestors. `draw` returns the damaged rects for `pg.display.update`."""
+    def __init__(self, clear_colour=(0, 0, 0)):
+        self.clear_colour = clear_colour
+        self._target_size = None
+        self._root: Element | None = None
+        # The tree in draw order, and for each element its rect clipped by its clipping
+        # ancestors, those ancestors' clip, where and how opaque it's drawn, and the
+        # (dx, dy, opacity, clip) its children are drawn with
+        self._elements: list[Element] = []
+        self._rects: list[pg.Rect] = []
+        self._clips: list[pg.Rect] = [] # Shared by siblings, so elements drawn with the same clip are batched
+        self._transforms: list[tuple] = []
+        self._contexts: list[tuple] = []
+        self._index: dict[Element, int] = {} # Element -> position in the lists
+        self._children: dict[Element, tuple] = {} # Children when collected, to find added and removed ones
+        self._drawn: dict[Element, tuple] = {} # Element -> (rect, x, y, surface, surface version, alpha)
+        self._changed: set[Element] = set() # Filled by draw_changed
+        listen_draw_changes(self._changed)
+        weakref.finalize(self, unlisten_draw_changes, self._changed)
+
+    def invalidate(self):
+        """Redraw everything on the next frame"""
+        self._target_size = None
+
+    def collect(self, e: Element, damage: list[pg.Rect], dx: float, dy: float, opacity: float,
+                clip: pg.Rect, descend: bool = True):
+        """Work out where and how the element is drawn, and its descendants' if `descend`
+        or that changed, damaging the rects of the ones whose draw state changed.
+
+        Elements not in the lists yet are appended, so collecting the tree into empty
+        lists adds it in draw order. Hidden elements get an empty rect. Loops over a
+        stack rather than recursing, so the tree's depth isn't limited."""
+        stack = [(e, dx, dy, opacity, clip, descend)]
+        while stack:
+            e, dx, dy, opacity, clip, descend = stack.pop()
+            if e._draw_offset:
+                dx += e._draw_offset.x
+                dy += e._draw_offset.y
+            if not e._visible:
+                opacity = 0.0
+            elif e._opacity != 1.0:
+                opacity *= e._opacity
+
+            dest = (e.position.x + dx, e.position.y + dy) if dx or dy else e.position
+            rect = pg.Rect(dest, e._size)
+            if opacity > 0:
+                e.refresh_surface()
+                drawn = rect.clip(clip)
+            else:
+                drawn = pg.Rect(rect.topleft, (0, 0))
+            context = (dx, dy, opacity, clip.clip(rect) if e._clip else clip)
+
+            i = self._index.get(e)
+            if i is None:
+                self._index[e] = len(self._elements)
+                self._elements.append(e)
+                self._rects.append(drawn)
+                self._clips.append(clip)
+                self._transforms.append((dest, opacity))
+                self._contexts.append(context)
+                self._children[e] = tuple(e._children)
+            else:
+                self._rects[i] = drawn
+                if self._clips[i] != clip:
+                    self._clips[i] = clip
+                self._transforms[i] = (dest, opacity)
+                if self._contexts[i] != context:
+                    self._contexts[i] = context
+                    descend = True
+
+            # The position too, a clipped element can move without its clipped rect changing
+            state = (drawn, int(dest[0]), int(dest[1]), e.surface, e.surface_version, int(opacity * 255))
+            prev = self._drawn.get(e)
+            if prev != state:
+                if prev:
+                    damage.append(prev[0])
+                damage.append(drawn)
+                self._drawn[e] = state
+
+            if descend:
+                # Reversed, so the first child is collected first and the lists stay in draw order
+                stack.extend((c, *context, True) for c in reversed(e._children))
+
+    def collect_all(self, root: Element, target: pg.Rect, damage: list[pg.Rect]):
+        """Collect the whole tree again, damaging the rects of the elements no longer in it"""
+        self._root = root
+        self._elements, self._rects, self._clips, self._transforms, self._contexts = [], [], [], [], []
+        self._index = {}
+        self._children = {}
+        self._changed.clear()
+        self.collect(root, damage, 0, 0, 1.0, target)
+
+        for e in [e for e in self._drawn if e not in self._index]:
+            damage.append(self._drawn.pop(e)[0])
+
+    def collect_changed(self, root: Element, target: pg.Rect, damage: list[pg.Rect]) -> bool:
+        """Collect the elements passed to draw_changed, returns False if the tree's structure
+        changed, so it has to be collected again"""
+        changed = list(self._changed)
+        self._changed.clear()
+        if len(changed) > len(self._elements) // 2:
+            return False # Quicker to collect everything
+
+        index = self._index
+        collected = []
+        for e in changed:
+            if e not in index:
+                while e is not None and e is not root: # Skip elements outside the tree
+                    e = e.parent
+                if e is root:
+                    return False
+            elif e is not root and e.parent not in index or tuple(e._children) != self._children[e]:
+                return False
+            else:
+                collected.append(e)
+
+        # Ancestors first, so their descendants are collected with their new transform
+        collected.sort(key=index.__getitem__)
+        contexts = self._contexts
+        for e in collected:
+            if e is root:
+                self.collect(e, damage, 0, 0, 1.0, target, False)
+            else:
+                self.collect(e, damage, *contexts[index[e.parent]], False)
+        return True
+
+    def draw(self, root: Element, surf: pg.Surface) -> list[pg.Rect]:
+        return profiler.run('draw', self._draw, root, surf)
+
+    def _draw(self, root: Element, surf: pg.Surface) -> list[pg.Rect]:
+        target = surf.get_rect()
+        damage = []
+        if surf.get_size() != self._target_size or root is not self._root:
+            self._target_size = surf.get_size()
+            self.collect_all(root, target, damage)
+            damage = [target]
+        elif self._changed:
+            if not self.collect_changed(root, target, damage):
+                self.collect_all(root, target, damage)
+            damage = merge_rects(damage)
+        if not damage:
+            return damage
+
+        elements, rects, clips, transforms = self._elements, self._rects, self._clips, self._transforms
+        clip = surf.get_clip()
+        batch: list[tuple[pg.Surface, pg.Vector2]] = []
+        for r in damage:
+            surf.set_clip(r) # fill is clipped too, don't leave the last element's clip on
+            surf.fill(self.clear_colour, r)
+            hits = r.collidelistall(rects)
+            area = None
+            for i in hits:
+                e = elements[i]
+                if clips[i] is not area:
+                    blit_batch(surf, batch)
+                    area = clips[i]
+                    surf.set_clip(r.clip(area))
+
+                dest, opacity = transforms[i]
+                if e.surface is not None and e.__class__.draw is Element.draw and opacity == 1.0:
+                    batch.append((e.surface, dest))
+                elif e.surface is not None or e._fill is None or e._fill:
+                    blit_batch(surf, batch)
+                    e.draw(surf, dest, opacity)
+            blit_batch(surf, batch)
+            if profiler.enabled:
+                profiler.add('draw.nodes', len(hits))
+        surf.set_clip(clip)
+
+        return damage
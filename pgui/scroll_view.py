@@ -0,0 +1,111 @@
+import pygame as pg
+from math import ceil
+from typing import Callable
+from .element import Element, start, fixed, free_surface_r
+from .layout import update_children_r
+from .input import actions
+
+class ScrollView(Element):
+    """Vertical list that only creates and lays out the rows inside its viewport.
+
+    `make_row(index)` makes the row for an item. If `bind_row(row, index)` is given, rows
+    scrolled out of view are kept and rebound to the items scrolled into view instead.
+    Rows are `row_height` tall, and are scrolled with the mouse wheel while hovered,
+    when `input.update(root)` is given the root."""
+    __slots__ = ('_offset', '_item_count', 'make_row', 'bind_row', 'row_height', 'scroll_speed',
+                 '_scroll', '_rows', '_free_rows', '_viewport_size')
+
+    def __init__(self, item_count: int, make_row: Callable[[int], Element], row_height: float,
+                 bind_row: Callable[[Element, int], None] | None = None, **args):
+        self._offset = 0 # Scroll past the top of the first row
+        super().__init__(**args)
+        self.horizontal = False
+        self.justify = start
+        self.clip = True
+
+        self._item_count = item_count
+        self.make_row = make_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.scroll_speed = args.get('scroll_speed', 3 * row_height) # Per mouse wheel step
+
+        self._scroll = 0
+        self._rows: dict[int, Element] = {} # Item index -> row
+        self._free_rows: list[Element] = []
+        self._viewport_size = None # Size the rows were last made for
+
+        self.listen(actions.mwheel, self.on_mwheel)
+
+    @property
+    def padding(self):
+        # The rows are scrolled by moving the content's top edge up
+        l, r, t, b = self._padding
+        return [l, r, t - self._offset, b]
+    @padding.setter
+    def padding(self, value):
+        Element.padding.fset(self, value)
+
+    @property
+    def item_count(self): return self._item_count
+    @item_count.setter
+    def item_count(self, value):
+        self._item_count = value
+        self.scroll = self._scroll # Clamp to the new content height
+        self.update_rows()
+
+    @property
+    def viewport_height(self): return self.height - self._padding[2] - self._padding[3]
+
+    @property
+    def max_scroll(self): return max(0, self._item_count * self.row_height - self.viewport_height)
+
+    @property
+    def scroll(self): return self._scroll
+    @scroll.setter
+    def scroll(self, value):
+        value = pg.math.clamp(value, 0, self.max_scroll)
+        if value != self._scroll:
+            self._scroll = value
+            self.update_rows()
+
+    def scroll_by(self, amount):
+        self.scroll = self._scroll + amount
+
+    def on_mwheel(self, **args):
+        # Bubbles up from the hovered row, nested views don't scroll this one too
+        self.scroll_by(-args['y'] * self.scroll_speed)
+        return True
+
+    def on_layout(self):
+        if self._viewport_size != (self.width, self.height):
+            self._viewport_size = (self.width, self.height)
+            self._scroll = pg.math.clamp(self._scroll, 0, self.max_scroll)
+            self.update_rows()
+
+    def update_rows(self):
+        """Make, recycle or drop rows to cover the viewport, and lay them out"""
+        first = int(self._scroll // self.row_height)
+        last = min(self._item_count, ceil((self._scroll + self.viewport_height) / self.row_height))
+
+        for i in [i for i in self._rows if not first <= i < last]:
+            row = self._rows.pop(i)
+            if self.bind_row:
+                self._free_rows.append(row)
+            else:
+                free_surface_r(row)
+
+        for i in range(first, last):
+            if i in self._rows:
+                continue
+
+            row = self._free_rows.pop() if self._free_rows else self.make_row(i)
+            if self.bind_row:
+                self.bind_row(row, i)
+            # After binding, which can resize the row, like setting a Text's text
+            row.height = self.row_height
+            row.sizing_h = fixed
+            self._rows[i] = row
+
+        self._offset = self._scroll - first * self.row_height
+        self.children = [self._rows[i] for i in range(first, last)]
+        update_children_r(self)
@@ -0,0 +1,202 @@
+import pygame as pg
+from math import floor
+from .element import Element, layout_generation, layout_changes
+
+coarse = 8 # Coarse grid cells are this many cells across
+
+class SpatialIndex():
+    """Grid over the elements' rects for hit testing.
+
+    Set it as the root's `hit_index` and `get_hovered` looks up only the elements in
+    the grid cells under the point. Large elements are kept in a coarser grid, so each
+    element is in a few cells. After `update_dirty_r` only the elements it laid out are
+    indexed again, after other layout updates the grid is rebuilt on the next query. Call
+    `rebuild` after moving elements or changing `flatten` or `clickthrough` outside of one.
+    Changing `clip` indexes the element's subtree again on the next query."""
+    def __init__(self, cell_size: int = 64):
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int, int], set[Element]] = {} # (level, x, y) -> elements
+        self._rects: dict[Element, tuple[pg.FRect, tuple[int, int, int, int, int]]] = {} # Element -> clipped rect, (level, cell range)
+        self._children: dict[Element, list[Element]] = {} # Children when last indexed, to find removed ones
+        self._root: Element | None = None
+        self._generation = -1
+
+    def rebuild(self, root: Element):
+        """Index the root's hoverable elements"""
+        self._root = root
+        self._generation = layout_generation()
+        self._cells = {}
+        self._rects = {}
+        self._children = {}
+        if root.flatten:
+            self._index(root, root.rect)
+        else:
+            self._add(root, None)
+
+    def update(self, elements: list[Element], subtrees: list[Element]):
+        """Index the elements and subtrees again, after they were laid out"""
+        clips = {} # Element -> clip of its children, for the elements visited so far
+        added = []
+        for e in elements:
+            if (clip := self._clip(e, clips)) is False:
+                continue # Not in the tree anymore
+
+            rect = self._clipped(e.rect, clip)
+            old = self._rects.get(e)
+            if e._clip and (old is None or old[0] != rect):
+                subtrees.append(e) # Its children's clip changed
+                continue
+
+            added += self._update_children(e)
+            if not e.clickthrough or e is self._root:
+                self._index(e, rect)
+
+        for e in subtrees + added:
+            if (clip := self._clip(e, clips)) is not False:
+                self._add(e, clip)
+
+    def _update_children(self, e: Element) -> list[Element]:
+        """Remove the element's children that were removed since it was indexed, returns the added ones"""
+        children = e._children
+        indexed = self._children.get(e)
+        if not indexed:
+            self._children[e] = list(children)
+            return self._children[e]
+        if children == indexed:
+            return []
+
+        current = set(children)
+        for c in indexed:
+            if c in current:
+                continue
+            # Moved to a parent indexed again already, otherwise that parent's pass adds it back
+            parent = c.parent
+            if parent is not e and parent is not None and c in self._children.get(parent, ()) \
+                    and c in parent._children:
+                continue
+            self._remove(c)
+        self._children[e] = list(children)
+        previous = set(indexed)
+        return [c for c in children if c not in previous]
+
+    def _clip(self, e: Element, clips: dict) -> pg.FRect | None | bool:
+        """Returns the intersection of the element's clipping ancestors' rects, None if it
+        has none, or False if it isn't in the indexed tree"""
+        if e is self._root:
+            return None
+
+        parent = e.parent
+        if parent is None or parent not in self._children:
+            return False
+        if parent in clips:
+            return clips[parent]
+
+        clip = self._clip(parent, clips)
+        if clip is not False and parent._clip:
+            clip = parent.rect if clip is None else clip.clip(parent.rect)
+        clips[parent] = clip
+        return clip
+
+    @staticmethod
+    def _clipped(rect: pg.FRect, clip: pg.FRect | None) -> pg.FRect:
+        return rect if clip is None else rect.clip(clip)
+
+    def _add(self, e: Element, clip: pg.FRect | None):
+        """Index the element and its descendants, replacing their entries"""
+        stack = [(e, clip)]
+        while stack:
+            curr, clip = stack.pop()
+            rect = self._clipped(curr.rect, clip)
+            if not curr.clickthrough or curr is self._root:
+                self._index(curr, rect)
+            self._update_children(curr)
+            if curr._clip:
+                clip = rect
+                if not clip:
+                    for c in curr._children:
+                        self._remove(c)
+                    continue
+
+            for c in curr._children:
+                stack.append((c, clip))
+
+    def _remove(self, e: Element):
+        """Remove the element and its descendants, as they were indexed"""
+        stack = [e]
+        while stack:
+            curr = stack.pop()
+            self._unindex(curr)
+            stack.extend(self._children.pop(curr, ()))
+
+    def _index(self, e: Element, rect: pg.FRect):
+        if not rect.w or not rect.h:
+            self._unindex(e)
+            return
+
+        # Elements covering more than a few cells go in the coarse grid
+        size = self.cell_size
+        cells = (0, floor(rect.left / size), floor(rect.right / size), floor(rect.top / size), floor(rect.bottom / size))
+        if (cells[2] - cells[1] + 1) * (cells[4] - cells[3] + 1) > 4:
+            size *= coarse
+            cells = (1, floor(rect.left / size), floor(rect.right / size), floor(rect.top / size), floor(rect.bottom / size))
+
+        old = self._rects.get(e)
+        self._rects[e] = (rect, cells)
+        if old is not None:
+            if old[1] == cells:
+                return
+            self._uncell(e, old[1])
+
+        level = cells[0]
+        for cx in range(cells[1], cells[2] + 1):
+            for cy in range(cells[3], cells[4] + 1):
+                cell = self._cells.get((level, cx, cy))
+                if cell is None:
+                    self._cells[(level, cx, cy)] = {e}
+                else:
+                    cell.add(e)
+
+    def _unindex(self, e: Element):
+        entry = self._rects.pop(e, None)
+        if entry is not None:
+            self._uncell(e, entry[1])
+
+    def _uncell(self, e: Element, cells: tuple[int, int, int, int, int]):
+        level = cells[0]
+        for cx in range(cells[1], cells[2] + 1):
+            for cy in range(cells[3], cells[4] + 1):
+                self._cells[(level, cx, cy)].discard(e)
+
+    def get_hovered(self, root: Element, pos):
+        """Returns the hovered elements, deepest first"""
+        if root is not self._root or root.flatten:
+            self.rebuild(root)
+        elif self._generation != layout_generation():
+            changes = layout_changes(self._generation)
+            if changes is None:
+                self.rebuild(root)
+            else:
+                self.update(*changes)
+                self._generation = layout_generation()
+
+        x, y = pos
+        size = self.cell_size
+        rects = self._rects
+        hits = []
+        for cell in (self._cells.get((0, floor(x / size), floor(y / size))),
+                     self._cells.get((1, floor(x / (size * coarse)), floor(y / (size * coarse))))):
+            if cell:
+                hits += [e for e in cell if rects[e][0].collidepoint(pos)]
+        # Same order as root.bfs() reversed: deepest first, later siblings first
+        hits.sort(key=self.path, reverse=True)
+        return hits
+
+    @staticmethod
+    def path(e: Element) -> tuple[int, tuple[int, ...]]:
+        """Returns the element's depth and child indices from the root, ordering elements breadth first"""
+        indices = []
+        while e.parent is not None:
+            indices.append(e.parent._children.index(e))
+            e = e.parent
+        indices.reverse()
+        return len(indices), tuple(indices)
@@ -0,0 +1,67 @@
+import pygame as pg
+from collections import OrderedDict
+from .profiler import profiler
+
+class SurfacePool():
+    """Pool of SRCALPHA surfaces bucketed by size.
+
+    Surfaces are allocated with their size rounded up to a multiple of `granularity`
+    and handed out as subsurfaces of the requested size, so an element resizing by a
+    few pixels keeps reusing the same allocation. Released surfaces are evicted least
+    recently used first once more than `max_surfaces` are pooled."""
+    def __init__(self, granularity: int = 16, max_surfaces: int = 64):
+        self.granularity = granularity
+        self.max_surfaces = max_surfaces
+        self._buckets: OrderedDict[tuple[int, int], list[pg.Surface]] = OrderedDict()
+        self._pooled = 0
+
+    @property
+    def pooled(self): return self._pooled
+
+    def bucket(self, size) -> tuple[int, int]:
+        """Returns the size of the surfaces a surface of `size` is cut from"""
+        g = self.granularity
+        w, h = size
+        return (-(-int(w) // g) * g, -(-int(h) // g) * g)
+
+    def acquire(self, size) -> pg.Surface:
+        """Returns a surface of `size`, reusing a pooled one if possible.
+
+        The contents of a reused surface are undefined."""
+        key = self.bucket(size)
+        bucket = self._buckets.get(key)
+        if bucket:
+            base = bucket.pop()
+            self._pooled -= 1
+            if not bucket:
+                del self._buckets[key]
+        else:
+            base = pg.Surface(key, pg.SRCALPHA)
+            if profiler.enabled:
+                profiler.add('surfaces.allocated')
+
+        return base.subsurface((0, 0, int(size[0]), int(size[1])))
+
+    def release(self, surf: pg.Surface):
+        """Return a surface from `acquire` to the pool"""
+        base = surf.get_parent() or surf
+        key = base.get_size()
+        if key != self.bucket(key): # Not one of ours
+            return
+
+        self._buckets.setdefault(key, []).append(base)
+        self._buckets.move_to_end(key)
+        self._pooled += 1
+
+        while self._pooled > self.max_surfaces:
+            oldest_key, oldest = next(iter(self._buckets.items()))
+            oldest.pop(0)
+            self._pooled -= 1
+            if not oldest:
+                del self._buckets[oldest_key]
+
+    def clear(self):
+        self._buckets.clear()
+        self._pooled = 0
+
+surfaces = SurfacePool()
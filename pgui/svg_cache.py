@@ -0,0 +1,84 @@
+import pygame as pg
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class SVGCache():
+    """LRU cache of SVG rasters keyed by (path, mtime, size), shared by SVGElements.
+
+    Each file is read once per modification time. If `threaded`, sizes that aren't
+    cached are rasterized on a worker thread, and the file's last raster scaled to
+    the size is returned as a placeholder until it's done."""
+    def __init__(self, max_rasters: int = 256, threaded: bool = False):
+        self.max_rasters = max_rasters
+        self.threaded = threaded
+        self._files: dict[str, tuple[float, bytes]] = {} # Path -> (mtime, contents)
+        self._rasters: OrderedDict[tuple, pg.Surface] = OrderedDict()
+        self._latest: dict[str, pg.Surface] = {} # Path -> last raster, for placeholders
+        self._pending: dict[tuple, Future] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _load(self, path: str) -> tuple[float, bytes]:
+        mtime = os.path.getmtime(path)
+        file = self._files.get(path)
+        if file is None or file[0] != mtime:
+            with open(path, 'rb') as f:
+                file = (mtime, f.read())
+            self._files[path] = file
+
+        return file
+
+    @staticmethod
+    def _rasterize(data: bytes, size: tuple[int, int]) -> pg.Surface:
+        return pg.image.load_sized_svg(io.BytesIO(data), size)
+
+    def _store(self, key: tuple, raster: pg.Surface):
+        self._rasters[key] = raster
+        self._latest[key[0]] = raster
+        if len(self._rasters) > self.max_rasters:
+            self._rasters.popitem(last=False)
+
+    def get(self, path: str, size) -> tuple[pg.Surface | None, bool]:
+        """Returns the file rasterized to fit `size`, and whether it's final rather than a placeholder"""
+        size = (int(size[0]), int(size[1]))
+        if size[0] <= 0 or size[1] <= 0:
+            return None, True
+
+        mtime, data = self._load(path)
+        key = (path, mtime, size)
+
+        raster = self._rasters.get(key)
+        if raster is not None:
+            self._rasters.move_to_end(key)
+            return raster, True
+
+        if not self.threaded:
+            raster = self._rasterize(data, size)
+            self._store(key, raster)
+            return raster, True
+
+        future = self._pending.get(key)
+        if future is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pgui-svg")
+            self._pending[key] = self._executor.submit(self._rasterize, data, size)
+        elif future.done():
+            del self._pending[key]
+            raster = future.result()
+            self._store(key, raster)
+            return raster, True
+
+        latest = self._latest.get(path)
+        if latest is None or not latest.get_width() or not latest.get_height():
+            return None, False
+
+        scale = min(size[0] / latest.get_width(), size[1] / latest.get_height())
+        return pg.transform.smoothscale(latest, (latest.get_width() * scale, latest.get_height() * scale)), False
+
+    def clear(self):
+        self._files.clear()
+        self._rasters.clear()
+        self._latest.clear()
+
+svg_cache = SVGCache()
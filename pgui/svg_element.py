@@ -1,19 +1,30 @@
 import pygame as pg
-from .element import Element
+from .element import Element, draw_changed
+from .svg_cache import svg_cache
 
 class SVGElement(Element):
+    __slots__ = ('_file', '_cached_svg', '_svg_size', '_svg_final')
+
     def __init__(self, file, **args):
         super().__init__(**args)
         self._file = file
         self._cached_svg = None
+        self._svg_size = None # Size _cached_svg was fetched for
+        self._svg_final = False # False while _cached_svg is a placeholder
 
-    def draw(self, surf: pg.Surface):
-        if not self.surface:
-            raise RuntimeError(f"Tried to draw an element without a surface")
-
-        if not self._cached_svg:
-            self._cached_svg = pg.image.load_sized_svg(self._file, self.size - (sum(self.padding[:2]), sum(self.padding[2:])))
+    def refresh_surface(self):
+        size = self.size - (sum(self.padding[:2]), sum(self.padding[2:]))
+        if size != self._svg_size or not self._svg_final:
+            self._svg_size = size
+            svg, self._svg_final = svg_cache.get(self._file, size)
+            if svg is not self._cached_svg:
+                self._cached_svg = svg
+                self.redraw()
+            if not self._svg_final:
+                draw_changed(self) # Check for the rendered SVG again next frame
 
-        self.surface.blit(self._cached_svg, (self.padding[0], self.padding[2]))
+        super().refresh_surface()
 
-        super().draw(surf)
+    def draw_content(self, surf: pg.Surface):
+        if self._cached_svg:
+            surf.blit(self._cached_svg, (self.padding[0], self.padding[2]))
@@ -0,0 +1,117 @@
+import pygame as pg
+from collections import OrderedDict
+
+class TextCache():
+    """LRU caches of rendered text shared by Text elements.
+
+    Whole strings are cached by (font, text, colour, antialias). Strings that change
+    often, like counters, can instead be composed from cached glyphs with
+    `render_glyphs`, which ignores kerning.
+
+    Wrapped lines are cached by (font, text, width), and the word widths they're
+    broken from by (font, text), so rewrapping to a new width doesn't measure text."""
+    def __init__(self, max_strings: int = 1024, max_glyphs: int = 1024, max_wraps: int = 1024):
+        self.max_strings = max_strings
+        self.max_glyphs = max_glyphs
+        self.max_wraps = max_wraps
+        self._strings: OrderedDict[tuple, pg.Surface] = OrderedDict()
+        self._glyphs: OrderedDict[tuple, pg.Surface] = OrderedDict()
+        self._words: OrderedDict[tuple, tuple] = OrderedDict() # (font, text) -> (space width, paragraphs of (word, width))
+        self._wraps: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+
+    def _get(self, cache: OrderedDict, max_size: int, font: pg.Font, text: str, colour, antialias: bool):
+        key = (font, text, tuple(pg.Color(colour)), antialias)
+        surf = cache.get(key)
+        if surf is not None:
+            cache.move_to_end(key)
+            return surf
+
+        surf = font.render(text, antialias, colour)
+        cache[key] = surf
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+
+        return surf
+
+    def render(self, font: pg.Font, text: str, colour, antialias: bool = True) -> pg.Surface:
+        """Returns the rendered text. The surface is shared, don't draw on it"""
+        return self._get(self._strings, self.max_strings, font, text, colour, antialias)
+
+    def render_glyphs(self, font: pg.Font, text: str, colour, antialias: bool = True) -> pg.Surface:
+        """Returns the text composed from cached glyph renders"""
+        glyphs = [self._get(self._glyphs, self.max_glyphs, font, c, colour, antialias) for c in text]
+        x = 0
+        blits = []
+        for g in glyphs:
+            blits.append((g, (x, 0)))
+            x += g.get_width()
+
+        surf = pg.Surface((x, max((g.get_height() for g in glyphs), default=font.get_height())), pg.SRCALPHA)
+        surf.fblits(blits)
+
+        return surf
+
+    def measure_words(self, font: pg.Font, text: str):
+        """Returns the width of a space and the text's paragraphs as lists of (word, width)"""
+        key = (font, text)
+        words = self._words.get(key)
+        if words is not None:
+            self._words.move_to_end(key)
+            return words
+
+        words = (
+            font.size(' ')[0],
+            [[(word, font.size(word)[0]) for word in paragraph.split(' ')] for paragraph in text.split('\n')]
+        )
+        self._words[key] = words
+        if len(self._words) > self.max_wraps:
+            self._words.popitem(last=False)
+
+        return words
+
+    def wrap(self, font: pg.Font, text: str, width: float) -> tuple[str, ...]:
+        """Returns the text broken into lines no wider than `width`, where words allow"""
+        key = (font, text, width)
+        lines = self._wraps.get(key)
+        if lines is not None:
+            self._wraps.move_to_end(key)
+            return lines
+
+        space, paragraphs = self.measure_words(font, text)
+        lines = []
+        for paragraph in paragraphs:
+            line, line_width = [], 0
+            for word, word_width in paragraph:
+                if line and line_width + space + word_width > width:
+                    lines.append(' '.join(line))
+                    line, line_width = [], 0
+                line_width += space + word_width if line else word_width
+                line.append(word)
+            lines.append(' '.join(line))
+
+        lines = tuple(lines)
+        self._wraps[key] = lines
+        if len(self._wraps) > self.max_wraps:
+            self._wraps.popitem(last=False)
+
+        return lines
+
+    def render_lines(self, font: pg.Font, lines: tuple[str, ...], colour, antialias: bool = True) -> pg.Surface:
+        """Returns the lines rendered below each other"""
+        renders = [self.render(font, line, colour, antialias) for line in lines]
+        line_size = font.get_linesize()
+        surf = pg.Surface(
+            (max((r.get_width() for r in renders), default=0), line_size * len(renders)),
+            pg.SRCALPHA
+        )
+        surf.fblits([(r, (0, i * line_size)) for i, r in enumerate(renders)])
+
+        return surf
+
+    def clear(self):
+        self._strings.clear()
+        self._glyphs.clear()
+        self._words.clear()
+        self._wraps.clear()
+
+text_cache = TextCache()
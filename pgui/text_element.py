@@ -1,7 +1,11 @@
 import pygame as pg
 from .element import Element
+from .text_cache import text_cache
+from .fonts import fonts
 
 class Text(Element):
+    __slots__ = ('_cached_text', '_text', '_font', '_colour', 'antialias', 'glyphs', 'wrap', '_lines', 'text_surf')
+
     def __init__(self, **args):
         super().__init__(**args)
 
@@ -9,16 +13,78 @@ class Text(Element):
         self._text = None
 
         self._text = args.get('text', "NO TEXT")
-        self.font: pg.Font = args.get('font', pg.Font())
-        self.colour = args.get('colour', (0, 0, 0))
-        self.text_surf: pg.Surface = self.font.render(self.text, True, self.colour)
-        self.size = self.text_surf.get_size()
+        self._font: pg.Font = fonts.resolve(args.get('font')) # pg.Font or spec, see FontRegistry.resolve
+        self._colour = args.get('colour', (0, 0, 0))
+        self.antialias: bool = args.get('antialias', True)
+        self.glyphs: bool = args.get('glyphs', False) # Compose from cached glyphs, for text that changes often
+        self.wrap: bool = args.get('wrap', False) # Wrap to the width given by layout, and fit the height to the lines
+        if self.wrap and not {'sizing', 'sizing_w', 'width', 'size'} & args.keys():
+            self.sizing_w = 1 # Take the parent's width unless told otherwise
+        self._lines: tuple[str, ...] | None = None
+        self.text_surf: pg.Surface = pg.Surface((0, 0), pg.SRCALPHA)
+        self.render()
 
     @property
     def text(self): return self._text
+    @text.setter
+    def text(self, value):
+        if value != self._text:
+            self._text = value
+            self.render()
+
+    @property
+    def font(self): return self._font
+    @font.setter
+    def font(self, value):
+        value = fonts.resolve(value)
+        if value is not self._font:
+            self._font = value
+            self.render()
+
+    @property
+    def colour(self): return self._colour
+    @colour.setter
+    def colour(self, value):
+        if value != self._colour:
+            self._colour = value
+            self.render()
+
+    def render(self):
+        """Render the text through the shared cache and resize to it"""
+        if self.wrap:
+            self._lines = None # Wrapped when laid out
+            self.mark_dirty()
+            return
+
+        if self.glyphs:
+            self.text_surf = text_cache.render_glyphs(self.font, self._text, self._colour, self.antialias)
+        else:
+            self.text_surf = text_cache.render(self.font, self._text, self._colour, self.antialias)
+        self.size = self.text_surf.get_size()
+        self.redraw()
+
+    def fit_height(self):
+        if not self.wrap:
+            return
+
+        lines = text_cache.wrap(self.font, self._text, self.width - self.padding[0] - self.padding[1])
+        if lines != self._lines:
+            self._lines = lines
+            self.text_surf = text_cache.render_lines(self.font, lines, self._colour, self.antialias)
+            self.redraw()
+
+        self.height = self.text_surf.get_height() + self.padding[2] + self.padding[3]
+
+    def layout_style(self):
+        style = super().layout_style()
+        return style + (self.font, self._text) if self.wrap else style
+
+    def copy_layout(self, other):
+        super().copy_layout(other)
+        if self.wrap and other._lines != self._lines:
+            self._lines = other._lines
+            self.text_surf = text_cache.render_lines(self.font, self._lines, self._colour, self.antialias)
+            self.redraw()
 
-    def draw(self, surf: pg.Surface):
-        if self.surface is None:
-            raise RuntimeError(f"Tried to draw to empty txt surf")
-        self.surface.blit(self.text_surf, (self.padding[0], self.padding[2]))
-        super().draw(surf)
+    def draw_content(self, surf: pg.Surface):
+        surf.blit(self.text_surf, (self.padding[0], self.padding[2]))